@@ -1,11 +1,195 @@
 import google.generativeai as genai
 import logging
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from models.schemas import ItineraryRequest, ItineraryResponse, DayPlan, Activity
 from config import settings
+from utils.cache import SQLiteCache, TTLCache, prompt_cache_key
+from utils.rate_limit import RateLimitExceeded, TokenBucket, estimate_tokens, retry_after_seconds
+from utils.json_stream import JSONArrayItemSplitter, close_truncated_json
 from datetime import datetime, timedelta
-import json
-import time
+import asyncio
+import functools
+import orjson
+from pydantic import TypeAdapter
+import random
+import re
+from types import MappingProxyType
+from typing_extensions import TypedDict
+
+MODEL_NAME = 'gemini-2.0-flash-lite'
+BUDGET_BUCKET_INR = 500
+MAX_OUTPUT_TOKENS = 2200
+# Longest a single 429 retry may sleep, whatever Retry-After asks for
+MAX_RETRY_WAIT_SECONDS = 20
+# Longest a request queues for a requests-per-minute slot before falling back
+MAX_LIMITER_WAIT_SECONDS = 20
+
+# Parsed itinerary days keyed by prompt hash; identical prompts skip Gemini entirely
+_itinerary_cache = TTLCache(maxsize=1024, ttl=24 * 60 * 60)
+
+# Request JSON -> (ItineraryResponse, encoded body) for AI-generated responses
+_response_cache = TTLCache(maxsize=1024, ttl=24 * 60 * 60)
+
+# Validates a whole itinerary in one pydantic-core call instead of a model per activity
+_DAY_PLANS = TypeAdapter(List[DayPlan])
+
+# Prompt hash -> future for Gemini calls currently in flight, so concurrent
+# identical requests wait on one call instead of each issuing their own
+_inflight_itineraries: Dict[str, "asyncio.Future[Optional[List[dict]]]"] = {}
+
+# Fallback activities per trip type as (name, icon, time, share of daily budget)
+_TEMPLATES = MappingProxyType({
+    "luxurious": (
+        ("Spa & Wellness", "💆", "10:00 AM", 0.3),
+        ("Fine Dining Experience", "🍽️", "07:30 PM", 0.35),
+        ("Private City Tour", "🚗", "02:00 PM", 0.25),
+    ),
+    "adventurous": (
+        ("Trekking Expedition", "🥾", "07:00 AM", 0.35),
+        ("Water Sports", "🏄", "02:00 PM", 0.4),
+        ("Camping Experience", "⛺", "06:00 PM", 0.15),
+    ),
+    "family": (
+        ("Local Museum Visit", "🏛️", "10:00 AM", 0.15),
+        ("Family Restaurant", "🍴", "01:00 PM", 0.25),
+        ("Theme Park", "🎢", "03:00 PM", 0.35),
+    ),
+    "cultural": (
+        ("Heritage Walk", "🏛️", "09:00 AM", 0.2),
+        ("Traditional Performance", "🎭", "06:00 PM", 0.3),
+        ("Local Market Exploration", "🛍️", "04:00 PM", 0.15),
+    ),
+    "budget": (
+        ("Free Walking Tour", "🚶", "09:00 AM", 0.05),
+        ("Street Food Tour", "🍜", "12:00 PM", 0.15),
+        ("Public Park Visit", "🏞️", "04:00 PM", 0),
+    ),
+})
+
+
+# Prompt focus per trip type
+_TRIP_FOCUS = MappingProxyType({
+    "luxurious": "luxury venues",
+    "adventurous": "outdoor/sports",
+    "family": "family-friendly",
+    "cultural": "heritage/temples",
+    "beach": "water activities"
+})
+
+# Recommendation tip per trip type
+_TRIP_TYPE_TIPS = MappingProxyType({
+    "luxurious": "• Pre-book spa treatments and fine dining reservations - luxury venues fill up fast, especially weekends",
+    "adventurous": "• Check weather forecasts daily and have backup indoor activities ready for outdoor adventure plans",
+    "family": "• Plan activities with breaks every 2-3 hours - kids (and adults!) need downtime between attractions",
+    "cultural": "• Hire local guides at heritage sites - they reveal fascinating stories that plaques and apps miss",
+    "beach": "• Apply sunscreen 30 mins before beach time and reapply every 2 hours - skin protection is non-negotiable",
+    "budget": "• Eat where locals eat - street food and neighborhood eateries offer authentic taste at 1/3rd the tourist area prices",
+    "romantic": "• Book sunset experiences and rooftop dinners early - the best romantic spots have limited seating",
+    "solo": "• Join group tours or cooking classes to meet fellow travelers while exploring safely",
+    "business": "• Keep digital copies of all bookings and have offline maps downloaded - stay productive even without wifi"
+})
+
+# Regional tips, in priority order when a destination matches several regions
+_REGION_TIPS = MappingProxyType({
+    "metro": "• Use app-based cabs or metro instead of auto-rickshaws in big cities - transparent pricing saves haggling time",
+    "coastal": "• Rent a scooter or bike for the day (₹300-500) - coastal areas are best explored at your own pace",
+    "desert": "• Carry a water bottle and stay hydrated - Rajasthan's dry climate can be deceptive, especially while sightseeing",
+    "hill": "• Pack layers and a light jacket even in summer - hill stations get chilly in evenings and early mornings",
+})
+
+# Destination word -> region; adding a place is a one-line edit
+_WORD_RE = re.compile(r"[a-z]+")
+_DESTINATION_REGIONS = MappingProxyType({
+    **dict.fromkeys(("mumbai", "delhi", "bangalore", "kolkata", "chennai"), "metro"),
+    **dict.fromkeys(("goa", "kerala", "pondicherry", "andaman"), "coastal"),
+    **dict.fromkeys(("rajasthan", "jaipur", "udaipur", "jodhpur", "jaisalmer"), "desert"),
+    **dict.fromkeys(("manali", "shimla", "darjeeling", "mussoorie", "nainital"), "hill"),
+})
+
+
+# Structured output schema: Gemini returns bare JSON matching it, so the
+# prompt no longer has to spell out the format
+class _ActivityOut(TypedDict):
+    name: str
+    icon: str
+    time: str
+    cost: int
+    description: str
+
+
+class _DayOut(TypedDict):
+    day: int
+    activities: list[_ActivityOut]
+
+
+@functools.cache
+def _get_model() -> genai.GenerativeModel:
+    """
+    One model for every agent instance, built on first use
+
+    The SDK keeps a single process-wide client per service, so this also
+    keeps one pooled channel to Gemini.
+    """
+    genai.configure(api_key=settings.google_ai_api_key)
+    return genai.GenerativeModel(
+        model_name=MODEL_NAME,
+        generation_config={
+            'temperature': 0.45,
+            'max_output_tokens': MAX_OUTPUT_TOKENS,
+            'candidate_count': 1,
+            'top_p': 0.8,
+            'response_mime_type': 'application/json',
+            'response_schema': list[_DayOut]
+        },
+        safety_settings={
+            'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+            'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+            'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+            'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'
+        }
+    )
+
+
+# Second level behind _itinerary_cache that survives restarts; created on first use
+@functools.cache
+def _get_disk_cache() -> Optional[SQLiteCache]:
+    return SQLiteCache(settings.llm_cache_path) if settings.llm_cache_path else None
+
+
+def _get_cached_days(cache_key: str) -> Optional[List[dict]]:
+    """Parsed itinerary days from memory, then disk, or None on a miss"""
+    days_data = _itinerary_cache.get(cache_key)
+    if days_data is not None:
+        return days_data
+    
+    disk_cache = _get_disk_cache()
+    payload = disk_cache.get(cache_key) if disk_cache else None
+    if payload is None:
+        return None
+    days_data = orjson.loads(payload)
+    _itinerary_cache.set(cache_key, days_data)
+    return days_data
+
+
+def _store_days(cache_key: str, days_data: List[dict], num_days: int) -> None:
+    """Write parsed itinerary days through both cache levels, if none are missing"""
+    # Salvaged partial itineraries are served once but never cached; the disk
+    # level would otherwise hand them to every worker across restarts
+    if len(days_data) < num_days:
+        return
+    _itinerary_cache.set(cache_key, days_data)
+    disk_cache = _get_disk_cache()
+    if disk_cache:
+        disk_cache.set(cache_key, orjson.dumps(days_data))
+
+
+def _chunk_text(chunk) -> str:
+    """Text of the first candidate in a (possibly partial) Gemini response"""
+    candidates = getattr(chunk, "candidates", None)
+    if not candidates:
+        return ""
+    parts = getattr(candidates[0].content, "parts", None) or []
+    return "".join([part.text for part in parts if getattr(part, "text", None)])
 
 
 class ActivitiesAgent:
@@ -14,92 +198,222 @@ class ActivitiesAgent:
     Uses AI to create personalized plans based on trip type and destination
     """
     
+    # Constant instructions go first so Gemini's implicit prefix caching can reuse
+    # them across requests; only the short trip-specific suffix varies per call
+    STATIC_PREFIX = (
+        "You are a precise travel planner. Plan one entry per requested day with activities in chronological order "
+        "and time in \"hh:mm AM/PM\" format. Day 1 activity[0] must be Hotel Check-in at 02:00 PM, cost 0, icon 🏨. "
+        "After check-in include breakfast venue, signature experience, and dinner venue (four entries total on day 1). "
+        "Other days require exactly three entries: breakfast venue, main experience, dinner venue. Use authentic local "
+        "names, descriptions under 250 characters, and whole-rupee costs. Use concise icons such as 🍽️ for meals and "
+        "🎡/🏛️/🌄 for activities.\n"
+    )
+    
+    # Whole prompt pre-joined once; per request only the trip details are formatted in
+    PROMPT_TEMPLATE = STATIC_PREFIX + (
+        "Plan {num_days} sightseeing days in {destination} for a {trip_type} trip. "
+        "Daily activities budget: INR {budget:,.0f}. Focus: {focus}. Interests: {interests}. "
+        "Return exactly {num_days} day objects."
+    )
+    
     def __init__(self):
-        genai.configure(api_key=settings.google_ai_api_key)
         self.logger = logging.getLogger(__name__)
-        self.system_instruction = (
-            "You are a precise travel planner. Respond only with a single JSON array where each day object contains "
-            "exactly the fields day (int) and activities (list). Each activities entry must include name, icon, time, cost, "
-            "and description. Output must be valid minified JSON with no markdown or commentary. Descriptions can be up to 250 characters, "
-            "costs are positive integers, and day 1 begins with a hotel check-in entry. If the response risks exceeding the token limit, "
-            "prioritize keeping at least 3 activities per day and shorten descriptions, but prefer more activities up to 5 when possible."
-        )
-        self.model = genai.GenerativeModel(
-            model_name='gemini-2.0-flash-lite',
-            generation_config={
-                'temperature': 0.45,
-                'max_output_tokens': 2200,
-                'candidate_count': 1,
-                'top_p': 0.8
-            },
-            safety_settings={
-                'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-                'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'
-            }
-        )
+        self.model = _get_model()
+        self._limiter = TokenBucket(rpm=settings.gemini_rpm, tpm=settings.gemini_tpm, rpd=settings.gemini_rpd)
+        # Caps how many Gemini streams are open at once across all requests
+        self._gemini_slots = asyncio.Semaphore(settings.gemini_max_concurrency)
     
-    def generate_itinerary(self, request: ItineraryRequest) -> ItineraryResponse:
+    async def generate_itinerary(self, request: ItineraryRequest) -> ItineraryResponse:
         """
         Generate a complete day-by-day itinerary
         """
+        response, _ = await self.generate_itinerary_json(request)
+        return response
+    
+    async def generate_itinerary_json(self, request: ItineraryRequest) -> Tuple[ItineraryResponse, bytes]:
+        """
+        Generate an itinerary together with its encoded JSON body
+
+        Repeat requests get the cached response and bytes back without
+        touching Gemini or re-serializing the model.
+        """
+        response_key = request.model_dump_json()
+        cached = _response_cache.get(response_key)
+        if cached is not None:
+            self.logger.info("Itinerary response cache hit for %s", request.destination)
+            return cached
+        
         days = (request.end_date - request.start_date).days
         
         # Get AI-generated itinerary
-        itinerary = self._generate_ai_itinerary(request, days)
+        itinerary = await self._generate_ai_itinerary(request, days)
+        complete = itinerary is not None and len(itinerary) >= days
+        if itinerary is None:
+            itinerary = self._generate_fallback_itinerary(request, days)
+        elif not complete:
+            # Pad whatever Gemini did not deliver with template days
+            self.logger.warning("Gemini returned %s of %s days; filling the rest from fallback", len(itinerary), days)
+            itinerary = itinerary + self._generate_fallback_itinerary(request, days)[len(itinerary):]
         
-        # Calculate total cost
-        total_cost = sum(
-            sum(activity.cost for activity in day.activities)
-            for day in itinerary
-        )
+        # Calculate total cost from the per-day totals already on each DayPlan
+        total_cost = sum(day.total_cost for day in itinerary)
         
         # Get recommendations
         recommendations = self._get_recommendations(request, itinerary, total_cost)
         
-        return ItineraryResponse(
+        response = ItineraryResponse(
             itinerary=itinerary,
             total_activities_cost=total_cost,
             recommendations=recommendations
         )
+        result = (response, orjson.dumps(response.model_dump()))
+        
+        # Fallback and partial itineraries are not cached so the next request retries Gemini
+        if complete:
+            _response_cache.set(response_key, result)
+        return result
     
-    def _generate_ai_itinerary(self, request: ItineraryRequest, num_days: int) -> List[DayPlan]:
+    def _build_prompt(self, request: ItineraryRequest, num_days: int) -> str:
         """
-        Use AI to generate detailed itinerary
+        Render the itinerary prompt for a trip
         """
-        interests_str = ", ".join(request.interests) if request.interests else "general tourism"
-        
+        # Canonicalize the free-form inputs so requests that differ only in
+        # interest order, casing or duplicates render the same prompt and
+        # share a cache entry
+        interests = sorted({i.strip().lower() for i in request.interests or () if i and i.strip()})
+        interests_str = ", ".join(interests) if interests else "general tourism"
+        destination = " ".join(request.destination.split()).title()
+        trip_type = request.trip_type.strip().lower()
+
         # Calculate per-day budget
         budget_per_day = request.budget_allocation / num_days if num_days > 0 else request.budget_allocation
         
-        self.logger.info("Generating itinerary for %s (%s days)", request.destination, num_days)
-        self.logger.debug("  - Total activities budget: ₹%s", f"{request.budget_allocation:,.2f}")
-        self.logger.debug("  - Per day budget: ₹%s", f"{budget_per_day:,.2f}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("  - Total activities budget: ₹%s", f"{request.budget_allocation:,.2f}")
+            self.logger.debug("  - Per day budget: ₹%s", f"{budget_per_day:,.2f}")
+        
+        # Round to a ₹500 bucket: Gemini plans the same either way, and nearby
+        # budgets then share one cached itinerary
+        budget_bucket = round(budget_per_day / BUDGET_BUCKET_INR) * BUDGET_BUCKET_INR or budget_per_day
         
         # Ultra-compact prompt with strict output limits
-        trip_focus = {
-            "luxurious": "luxury venues",
-            "adventurous": "outdoor/sports",
-            "family": "family-friendly",
-            "cultural": "heritage/temples",
-            "beach": "water activities"
-        }.get(request.trip_type, "attractions")
+        trip_focus = _TRIP_FOCUS.get(trip_type, "attractions")
         
-        example_json = '[{"day":1,"activities":[{"name":"Hotel Check-in","icon":"🏨","time":"02:00 PM","cost":0,"description":"Arrive at your hotel and complete check-in process"},{"name":"Dinner at Natraj Dining Hall","icon":"🍽️","time":"08:00 PM","cost":900,"description":"Enjoy authentic Rajasthani thali with traditional dal, vegetables, and fresh roti"},{"name":"Bagore Ki Haveli folk show","icon":"🏛️","time":"07:00 PM","cost":1200,"description":"Experience traditional dance performances and puppet shows"}]}]'
-        prompt = (
-            f"{self.system_instruction}\n"
-            f"Plan {num_days} sightseeing days in {request.destination} for a {request.trip_type} trip. "
-            f"Daily activities budget: INR {budget_per_day:,.0f}. Focus: {trip_focus}. Interests: {interests_str}. "
-            f"Return a single minified JSON array with exactly {num_days} day objects. Each day object strictly uses "
-            "the keys day (int) and activities (list). Activities must be in chronological order with time in \"hh:mm AM/PM\" format. "
-            "Day 1 activity[0] must be Hotel Check-in at 02:00 PM, cost 0, icon 🏨. After check-in include breakfast venue, signature "
-            "experience, and dinner venue (four entries total on day 1). Other days require exactly three entries: breakfast venue, main "
-            "experience, dinner venue. Use authentic local names, keep descriptions under 250 characters, and costs as integers in INR. "
-            "Use concise icons such as 🍽️ for meals and 🎡/🏛️/🌄 for activities. No narration, markdown, or trailing text. "
-            f"Example:{example_json}"
+        return self.PROMPT_TEMPLATE.format(
+            num_days=num_days,
+            destination=destination,
+            trip_type=trip_type,
+            budget=budget_bucket,
+            focus=trip_focus,
+            interests=interests_str
         )
+    
+    async def stream_itinerary(self, request: ItineraryRequest) -> AsyncIterator[DayPlan]:
+        """
+        Yield each DayPlan as soon as Gemini finishes writing that day
+        """
+        num_days = (request.end_date - request.start_date).days
+        self.logger.info("Streaming itinerary for %s (%s days)", request.destination, num_days)
         
+        prompt = self._build_prompt(request, num_days)
+        cache_key = prompt_cache_key(MODEL_NAME, prompt)
+        cached_days = _get_cached_days(cache_key)
+        if cached_days is not None:
+            self.logger.info("Itinerary cache hit for %s", request.destination)
+            for day_plan in self._build_day_plans(request, cached_days):
+                yield day_plan
+            return
+        
+        days_data = []
+        splitter = JSONArrayItemSplitter()
+        try:
+            if await self._reserve_request(prompt):
+                async with self._gemini_slots:
+                    response = await self.model.generate_content_async(prompt, stream=True)
+                    async for chunk in response:
+                        for item in splitter.feed(_chunk_text(chunk)):
+                            day_data = orjson.loads(item)
+                            day_plan = self._build_day_plan(day_data, (request.start_date + timedelta(days=len(days_data))).isoformat())
+                            days_data.append(day_data)
+                            yield day_plan
+        except RateLimitExceeded as limit_error:
+            self.logger.warning("%s", limit_error)
+        except Exception as e:
+            self.logger.exception("Error streaming AI itinerary: %s", e)
+        
+        if len(days_data) >= num_days:
+            _store_days(cache_key, days_data, num_days)
+            return
+        
+        # Pad whatever Gemini did not deliver with template days
+        self.logger.warning("Streamed %s of %s days; filling the rest from fallback", len(days_data), num_days)
+        for day_plan in self._generate_fallback_itinerary(request, num_days)[len(days_data):]:
+            yield day_plan
+    
+    async def _generate_ai_itinerary(self, request: ItineraryRequest, num_days: int) -> Optional[List[DayPlan]]:
+        """
+        Use AI to generate detailed itinerary, or None when the fallback should be used
+        """
+        self.logger.info("Generating itinerary for %s (%s days)", request.destination, num_days)
+        
+        prompt = self._build_prompt(request, num_days)
+        cache_key = prompt_cache_key(MODEL_NAME, prompt)
+        cached_days = _get_cached_days(cache_key)
+        if cached_days is not None:
+            self.logger.info("Itinerary cache hit for %s", request.destination)
+            return self._build_day_plans(request, cached_days)
+
+        pending = _inflight_itineraries.get(cache_key)
+        if pending is not None:
+            # Same prompt already on its way to Gemini; share its result
+            self.logger.info("Joining in-flight itinerary request for %s", request.destination)
+            days_data = await asyncio.shield(pending)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            _inflight_itineraries[cache_key] = future
+            try:
+                days_data = await self._request_itinerary_days(request, prompt)
+                future.set_result(days_data)
+            finally:
+                if not future.done():
+                    future.set_result(None)
+                _inflight_itineraries.pop(cache_key, None)
+
+        if days_data is None:
+            return None
+
+        try:
+            itinerary = self._build_day_plans(request, days_data)
+        except (KeyError, TypeError, ValueError) as e:
+            self.logger.exception("Error building AI itinerary: %s", e)
+            return None
+
+        _store_days(cache_key, days_data, num_days)
+        return itinerary
+    
+    async def _reserve_request(self, prompt: str) -> bool:
+        """
+        Reserve limiter capacity for one Gemini call, or False when the caller should fall back
+        """
+        # TPM counts output too, so budget for the longest reply. If the token
+        # budget can't cover it now, fall back rather than spend a request (and
+        # daily quota) on a call that would come back 429; waiting for a free
+        # request slot is fine, within a bound.
+        tokens = estimate_tokens(prompt) + MAX_OUTPUT_TOKENS
+        if not self._limiter.has_token_budget(tokens):
+            self.logger.warning("Gemini token budget exhausted. Using fallback itinerary.")
+            return False
+        try:
+            await asyncio.wait_for(self._limiter.acquire(tokens), timeout=MAX_LIMITER_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            self.logger.warning("No Gemini request slot within %ss. Using fallback itinerary.", MAX_LIMITER_WAIT_SECONDS)
+            return False
+        return True
+    
+    async def _request_itinerary_days(self, request: ItineraryRequest, prompt: str) -> Optional[List[dict]]:
+        """
+        Call Gemini and parse the day objects, or None when the caller should fall back
+        """
         try:
             # Retry logic for rate limiting (429 errors)
             max_retries = 3
@@ -107,25 +421,42 @@ class ActivitiesAgent:
             
             for attempt in range(max_retries):
                 try:
-                    response = self.model.generate_content(prompt)
+                    if not await self._reserve_request(prompt):
+                        return None
+                    async with self._gemini_slots:
+                        response = await self.model.generate_content_async(prompt, stream=True)
+                        
+                        # Parse each day as soon as it closes so parsing overlaps generation,
+                        # and a response cut off later still leaves its complete days
+                        splitter = JSONArrayItemSplitter()
+                        streamed_days = []
+                        async for chunk in response:
+                            streamed_days.extend(orjson.loads(item) for item in splitter.feed(_chunk_text(chunk)))
                     break  # Success, exit retry loop
+                except RateLimitExceeded as limit_error:
+                    self.logger.warning("%s. Using fallback itinerary.", limit_error)
+                    return None
                 except Exception as rate_error:
                     error_msg = str(rate_error)
                     if "429" in error_msg or "Resource exhausted" in error_msg:
                         if attempt < max_retries - 1:
-                            wait_time = retry_delay * (2 ** attempt)  # Exponential backoff
-                            self.logger.warning("Rate limit hit (429). Retrying in %ss... (attempt %s/%s)", wait_time, attempt + 1, max_retries)
-                            time.sleep(wait_time)
+                            # Honour Retry-After when given, else exponential backoff with jitter
+                            wait_time = retry_after_seconds(rate_error)
+                            if wait_time is None:
+                                wait_time = retry_delay * (2 ** attempt) + random.uniform(0, retry_delay)
+                            wait_time = min(wait_time, MAX_RETRY_WAIT_SECONDS)
+                            self.logger.warning("Rate limit hit (429). Retrying in %.1fs... (attempt %s/%s)", wait_time, attempt + 1, max_retries)
+                            await asyncio.sleep(wait_time)
                         else:
                             self.logger.warning("Rate limit exceeded after %s attempts. Using fallback itinerary.", max_retries)
-                            return self._generate_fallback_itinerary(request, num_days)
+                            return None
                     else:
                         # Not a rate limit error, re-raise
                         raise
             
             if not response.candidates:
                 self.logger.warning("AI response missing candidates; falling back")
-                return self._generate_fallback_itinerary(request, num_days)
+                return None
 
             primary_candidate = response.candidates[0]
             parts = list(getattr(primary_candidate.content, "parts", []) or [])
@@ -136,7 +467,7 @@ class ActivitiesAgent:
                 self.logger.warning("AI response empty (finish_reason: %s)", finish_reason_name or 'UNKNOWN')
                 self.logger.debug("Destination: %s", request.destination)
                 self.logger.debug("Trip type: %s", request.trip_type)
-                return self._generate_fallback_itinerary(request, num_days)
+                return None
 
             if finish_reason_name and finish_reason_name != "STOP":
                 self.logger.warning("AI response incomplete (finish_reason: %s)", finish_reason_name)
@@ -147,235 +478,122 @@ class ActivitiesAgent:
                 else:
                     self.logger.warning("ISSUE: Finish reason value: %s", finish_reason_val)
 
-            # Build content safely from parts
-            content = "".join(getattr(part, "text", "") for part in parts).strip()
+            if streamed_days:
+                if finish_reason_name and finish_reason_name != "STOP":
+                    self.logger.info("Salvaged %s complete days from the stream", len(streamed_days))
+                return streamed_days
+            
+            # Nothing closed while streaming; try the full text and repair it if truncated
+            content = "".join([part.text for part in parts if getattr(part, "text", None)]).strip()
 
             if not content:
                 self.logger.warning("AI response produced empty text; using fallback")
-                return self._generate_fallback_itinerary(request, num_days)
-            
-            # Clean up markdown code blocks
-            if content.startswith("```"):
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-            
-            # Remove any text before the first [ and after the last ]
-            start_idx = content.find('[')
-            end_idx = content.rfind(']')
-            if start_idx != -1 and end_idx != -1:
-                content = content[start_idx:end_idx+1]
+                return None
             
-            # Clean up common JSON issues
-            content = content.strip()
-            
-            # Try to parse JSON
             try:
-                days_data = json.loads(content)
+                days_data = orjson.loads(content)
                 self.logger.info("JSON parsed successfully on first try")
-            except json.JSONDecodeError as json_err:
+            except orjson.JSONDecodeError as json_err:
                 self.logger.warning("JSON parsing error: %s", json_err)
-                self.logger.debug("Content preview: %s...", content[:500])
-                
-                # Try to fix common issues
-                import re
-                
-                self.logger.debug("Attempting to fix JSON...")
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("Content preview: %s...", content[:500])
                 
-                # 1. Remove trailing commas before } or ]
-                content = re.sub(r',(\s*[}\]])', r'\1', content)
+                # Cut back to the last complete value and close whatever is still open
+                repaired = close_truncated_json(content)
+                if repaired is None:
+                    self.logger.warning("Could not salvage any days, using fallback")
+                    return None
                 
-                # 2. Fix truncated descriptions - more aggressive approach
-                # Look for description fields that might be truncated
-                def fix_truncated_description(match):
-                    full_line = match.group(0)
-                    # If the description doesn't end with a quote followed by comma or closing brace
-                    if not re.search(r'"\s*[,}]', full_line):
-                        # Find where it should end (before next field or closing brace)
-                        # Truncate at reasonable length and close the string
-                        desc_value = match.group(1)
-                        if len(desc_value) > 80:
-                            desc_value = desc_value[:77] + '...'
-                        return f'"description": "{desc_value}"'
-                    return full_line
-                
-                # Fix description fields that might be incomplete
-                content = re.sub(r'"description"\s*:\s*"([^"]*)', fix_truncated_description, content)
-                
-                # 3. Remove any trailing commas again
-                content = re.sub(r',(\s*[}\]])', r'\1', content)
-                
-                # 4. Check for unclosed brackets/braces
-                open_brackets = content.count('[') - content.count(']')
-                open_braces = content.count('{') - content.count('}')
-                
-                if open_braces > 0 or open_brackets > 0:
-                    self.logger.debug("Closing %s braces and %s brackets", open_braces, open_brackets)
-                    
-                    # Smart closing: determine what needs to be closed based on structure
-                    # Check last non-whitespace character to determine context
-                    last_content = content.rstrip()
-                    
-                    # If last char is comma or quote, we're likely in an object
-                    if last_content.endswith((',', '"')):
-                        # Close the current field/object properly
-                        if open_braces >= 2:
-                            content += '\n      }'  # Close activity
-                            open_braces -= 1
-                        if open_braces >= 1:
-                            content += '\n    }'  # Close day
-                            open_braces -= 1
-                        if open_brackets >= 1:
-                            content += '\n    ]'  # Close activities array
-                            open_brackets -= 1
-                        if open_brackets >= 1:
-                            content += '\n]'  # Close days array
-                            open_brackets -= 1
-                    
-                    # Close any remaining structures
-                    for _ in range(open_braces):
-                        content += '\n  }'
-                    for _ in range(open_brackets):
-                        content += '\n]'
-                
-                # 5. Try parsing again
                 try:
-                    days_data = json.loads(content)
-                    self.logger.info("Fixed and parsed JSON successfully")
-                except Exception as retry_err:
-                    self.logger.warning("Still failing: %s", retry_err)
-                    
-                    # 6. Last resort: Extract only complete day objects
-                    self.logger.debug("Attempting to salvage complete days...")
-                    try:
-                        # More lenient pattern that matches complete day objects
-                        day_pattern = r'\{\s*"day"\s*:\s*\d+\s*,\s*"activities"\s*:\s*\[\s*(?:\{(?:[^{}]|\{[^}]*\})*\}\s*,?\s*)*\]\s*\}'
-                        day_matches = re.findall(day_pattern, content, re.DOTALL)
-                        
-                        if day_matches:
-                            # Clean each match
-                            clean_days = []
-                            for day_match in day_matches:
-                                # Remove trailing commas
-                                day_match = re.sub(r',(\s*[}\]])', r'\1', day_match)
-                                clean_days.append(day_match)
-                            
-                            content = '[' + ','.join(clean_days) + ']'
-                            days_data = json.loads(content)
-                            self.logger.info("Salvaged %s complete days", len(day_matches))
-                        else:
-                            self.logger.warning("Could not salvage any days, using fallback")
-                            return self._generate_fallback_itinerary(request, num_days)
-                    except:
-                        self.logger.warning("Could not fix JSON, using fallback")
-                        return self._generate_fallback_itinerary(request, num_days)
+                    days_data = orjson.loads(repaired)
+                except orjson.JSONDecodeError as repair_err:
+                    self.logger.warning("Could not fix JSON (%s), using fallback", repair_err)
+                    return None
+                self.logger.info("Salvaged %s days from truncated JSON", len(days_data))
             
-            # Convert to DayPlan objects
-            itinerary = []
-            current_date = request.start_date
-            
-            for day_data in days_data:
-                activities = [
-                    Activity(
-                        name=act["name"],
-                        icon=act.get("icon", "📍"),
-                        time=act["time"],
-                        cost=float(act.get("cost", 0)),
-                        description=act["description"]
-                    )
-                    for act in day_data["activities"]
-                ]
-                
-                day_cost = sum(act.cost for act in activities)
-                
-                itinerary.append(DayPlan(
-                    day=day_data["day"],
-                    date=current_date.strftime("%Y-%m-%d"),
-                    activities=activities,
-                    total_cost=day_cost
-                ))
-                
-                current_date += timedelta(days=1)
-            
-            return itinerary
+            return days_data
 
         except Exception as e:
             self.logger.exception("Error generating AI itinerary: %s", e)
-            return self._generate_fallback_itinerary(request, num_days)
+            return None
+    
+    def _build_day_plans(self, request: ItineraryRequest, days_data: List[dict]) -> List[DayPlan]:
+        """
+        Convert parsed AI output into DayPlan objects dated from the trip start
+        """
+        return _DAY_PLANS.validate_python([
+            self._day_plan_fields(day_data, (request.start_date + timedelta(days=offset)).isoformat())
+            for offset, day_data in enumerate(days_data)
+        ])
+    
+    def _build_day_plan(self, day_data: dict, day_date: str) -> DayPlan:
+        """
+        Convert one parsed AI day object into a DayPlan
+        """
+        return DayPlan.model_validate(self._day_plan_fields(day_data, day_date))
+    
+    def _day_plan_fields(self, day_data: dict, day_date: str) -> dict:
+        """
+        Shape one parsed AI day object as DayPlan input, filling optional activity fields
+        """
+        activities = day_data["activities"]
+        for act in activities:
+            act.setdefault("icon", "📍")
+            act.setdefault("cost", 0)
+        
+        return {
+            "day": day_data["day"],
+            "date": day_date,
+            "activities": activities,
+            "total_cost": sum(float(act["cost"]) for act in activities)
+        }
     
     def _generate_fallback_itinerary(self, request: ItineraryRequest, num_days: int) -> List[DayPlan]:
         """
         Generate fallback itinerary if AI fails
         """
         itinerary = []
-        current_date = request.start_date
         budget_per_day = request.budget_allocation / num_days if num_days > 0 else request.budget_allocation
         
-        # Generic activities for different trip types
-        activity_templates = {
-            "luxurious": [
-                {"name": "Spa & Wellness", "icon": "💆", "time": "10:00 AM", "cost_pct": 0.3},
-                {"name": "Fine Dining Experience", "icon": "🍽️", "time": "07:30 PM", "cost_pct": 0.35},
-                {"name": "Private City Tour", "icon": "🚗", "time": "02:00 PM", "cost_pct": 0.25},
-            ],
-            "adventurous": [
-                {"name": "Trekking Expedition", "icon": "🥾", "time": "07:00 AM", "cost_pct": 0.35},
-                {"name": "Water Sports", "icon": "🏄", "time": "02:00 PM", "cost_pct": 0.4},
-                {"name": "Camping Experience", "icon": "⛺", "time": "06:00 PM", "cost_pct": 0.15},
-            ],
-            "family": [
-                {"name": "Local Museum Visit", "icon": "🏛️", "time": "10:00 AM", "cost_pct": 0.15},
-                {"name": "Family Restaurant", "icon": "🍴", "time": "01:00 PM", "cost_pct": 0.25},
-                {"name": "Theme Park", "icon": "🎢", "time": "03:00 PM", "cost_pct": 0.35},
-            ],
-            "cultural": [
-                {"name": "Heritage Walk", "icon": "🏛️", "time": "09:00 AM", "cost_pct": 0.2},
-                {"name": "Traditional Performance", "icon": "🎭", "time": "06:00 PM", "cost_pct": 0.3},
-                {"name": "Local Market Exploration", "icon": "🛍️", "time": "04:00 PM", "cost_pct": 0.15},
-            ],
-            "budget": [
-                {"name": "Free Walking Tour", "icon": "🚶", "time": "09:00 AM", "cost_pct": 0.05},
-                {"name": "Street Food Tour", "icon": "🍜", "time": "12:00 PM", "cost_pct": 0.15},
-                {"name": "Public Park Visit", "icon": "🏞️", "time": "04:00 PM", "cost_pct": 0},
-            ]
-        }
+        templates = _TEMPLATES.get(request.trip_type.lower(), _TEMPLATES["family"])
         
-        templates = activity_templates.get(request.trip_type.lower(), activity_templates["family"])
+        # Template activities are identical every day, so build them once and
+        # share the instances across days (nothing mutates them afterwards).
+        # The data is ours and already well-typed, so skip validation.
+        base_activities = [
+            Activity.model_construct(
+                name=name,
+                icon=icon,
+                time=time,
+                cost=round(budget_per_day * pct, 2),
+                description=f"Experience {name.lower()} in {request.destination}"
+            )
+            for name, icon, time, pct in templates
+        ]
+        base_cost = sum(act.cost for act in base_activities)
+        
+        # date.isoformat() is the same YYYY-MM-DD as strftime without format parsing
+        date_strs = [(request.start_date + timedelta(days=i)).isoformat() for i in range(num_days)]
         
         for day in range(1, num_days + 1):
-            activities = []
+            activities = list(base_activities)
             
-            # Add check-in on first day
+            # Add check-in on first day (free, so the day cost is unchanged)
             if day == 1:
-                activities.append(Activity(
+                activities.insert(0, Activity.model_construct(
                     name="Hotel Check-in & Relaxation",
                     icon="🏨",
                     time="12:00 PM",
-                    cost=0,
+                    cost=0.0,
                     description=f"Arrive and settle into your accommodation in {request.destination}"
                 ))
             
-            # Add activities from templates
-            for i, template in enumerate(templates[:3]):
-                cost = budget_per_day * template["cost_pct"]
-                activities.append(Activity(
-                    name=template["name"],
-                    icon=template["icon"],
-                    time=template["time"],
-                    cost=round(cost, 2),
-                    description=f"Experience {template['name'].lower()} in {request.destination}"
-                ))
-            
-            day_cost = sum(act.cost for act in activities)
-            
-            itinerary.append(DayPlan(
+            itinerary.append(DayPlan.model_construct(
                 day=day,
-                date=current_date.strftime("%Y-%m-%d"),
+                date=date_strs[day - 1],
                 activities=activities,
-                total_cost=day_cost
+                total_cost=base_cost
             ))
-            
-            current_date += timedelta(days=1)
         
         return itinerary
     
@@ -409,35 +627,32 @@ class ActivitiesAgent:
             tips.append("• Book popular attractions online in advance to skip queues and often get 10-15% discounts")
         
         # Tip 3: Trip-type specific advice
-        trip_type_tips = {
-            "luxurious": "• Pre-book spa treatments and fine dining reservations - luxury venues fill up fast, especially weekends",
-            "adventurous": "• Check weather forecasts daily and have backup indoor activities ready for outdoor adventure plans",
-            "family": "• Plan activities with breaks every 2-3 hours - kids (and adults!) need downtime between attractions",
-            "cultural": "• Hire local guides at heritage sites - they reveal fascinating stories that plaques and apps miss",
-            "beach": "• Apply sunscreen 30 mins before beach time and reapply every 2 hours - skin protection is non-negotiable",
-            "budget": "• Eat where locals eat - street food and neighborhood eateries offer authentic taste at 1/3rd the tourist area prices",
-            "romantic": "• Book sunset experiences and rooftop dinners early - the best romantic spots have limited seating",
-            "solo": "• Join group tours or cooking classes to meet fellow travelers while exploring safely",
-            "business": "• Keep digital copies of all bookings and have offline maps downloaded - stay productive even without wifi"
-        }
-        
-        trip_tip = trip_type_tips.get(request.trip_type.lower(), 
+        trip_tip = _TRIP_TYPE_TIPS.get(request.trip_type.lower(), 
                                        "• Try local cuisine at neighborhood restaurants - authentic experiences are found off the tourist trail")
         tips.append(trip_tip)
         
         # Tip 4: Destination-specific wisdom (optional 4th tip)
-        destination_lower = request.destination.lower()
-        if any(city in destination_lower for city in ["mumbai", "delhi", "bangalore", "kolkata", "chennai"]):
-            tips.append("• Use app-based cabs or metro instead of auto-rickshaws in big cities - transparent pricing saves haggling time")
-        elif any(place in destination_lower for place in ["goa", "kerala", "pondicherry", "andaman"]):
-            tips.append("• Rent a scooter or bike for the day (₹300-500) - coastal areas are best explored at your own pace")
-        elif any(place in destination_lower for place in ["rajasthan", "jaipur", "udaipur", "jodhpur", "jaisalmer"]):
-            tips.append("• Carry a water bottle and stay hydrated - Rajasthan's dry climate can be deceptive, especially while sightseeing")
-        elif any(place in destination_lower for place in ["manali", "shimla", "darjeeling", "mussoorie", "nainital"]):
-            tips.append("• Pack layers and a light jacket even in summer - hill stations get chilly in evenings and early mornings")
+        regions = {
+            _DESTINATION_REGIONS[word]
+            for word in _WORD_RE.findall(request.destination.lower())
+            if word in _DESTINATION_REGIONS
+        }
+        for region, tip in _REGION_TIPS.items():
+            if region in regions:
+                tips.append(tip)
+                break
         
         return '\n'.join(tips)
 
 
-# Initialize agent instance
-activities_agent = ActivitiesAgent()
+@functools.cache
+def get_activities_agent() -> ActivitiesAgent:
+    """Shared agent instance, created on first use rather than at import"""
+    return ActivitiesAgent()
+
+
+def __getattr__(name: str):
+    # Keep the old `activities_agent` module attribute working without building it at import
+    if name == "activities_agent":
+        return get_activities_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -5,9 +5,18 @@ Sign up at: https://developers.amadeus.com/register
 """
 
 from amadeus import Client, ResponseError
-from typing import List, Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Optional, Tuple, Union
+from dataclasses import dataclass
+import asyncio
+import functools
+import requests
+import urllib.request
 from datetime import datetime
+from types import MappingProxyType
 from config import settings
+from utils.cache import TTLCache
 import logging
 
 # Module logger
@@ -22,6 +31,184 @@ CURRENCY_TO_INR = {
     'SGD': 62.0,   # 1 SGD ≈ ₹62
 }
 
+# Common Indian city codes, mapped to the IATA code of the nearest airport
+_CITY_CODES = MappingProxyType({
+    'delhi': 'DEL',
+    'new delhi': 'DEL',
+    'mumbai': 'BOM',
+    'bangalore': 'BLR',
+    'bengaluru': 'BLR',
+    'chennai': 'MAA',
+    'kolkata': 'CCU',
+    'hyderabad': 'HYD',
+    'pune': 'PNQ',
+    'ahmedabad': 'AMD',
+    'jaipur': 'JAI',
+    'goa': 'GOI',
+    'kochi': 'COK',
+    'cochin': 'COK',
+    'lucknow': 'LKO',
+    'thiruvananthapuram': 'TRV',
+    'trivandrum': 'TRV',
+    'chandigarh': 'IXC',
+    'indore': 'IDR',
+    'bhubaneswar': 'BBI',
+    'raipur': 'RPR',
+    'ranchi': 'IXR',
+    'patna': 'PAT',
+    'varanasi': 'VNS',
+    'banaras': 'VNS',
+    'agra': 'AGR',
+    'srinagar': 'SXR',
+    'amritsar': 'ATQ',
+    'guwahati': 'GAU',
+    'mangalore': 'IXE',
+    'vijayawada': 'VGA',
+    'coimbatore': 'CJB',
+    'madurai': 'IXM',
+    'visakhapatnam': 'VTZ',
+    'vizag': 'VTZ',
+    'nagpur': 'NAG',
+    'udaipur': 'UDR',
+    'jodhpur': 'JDH',
+    'shimla': 'SLV',
+    'manali': 'KUU',
+    'leh': 'IXL',
+    'port blair': 'IXZ',
+    'imphal': 'IMF',
+    'aizawl': 'AJL',
+    'pondicherry': 'PNY',
+    'puducherry': 'PNY',
+    # Hill stations and tourist destinations
+    'dehradun': 'DED',
+    'mussoorie': 'DED',  # Nearest airport is Dehradun
+    'rishikesh': 'DED',  # Nearest airport is Dehradun
+    'haridwar': 'DED',  # Nearest airport is Dehradun
+    'nainital': 'PGH',  # Pantnagar airport
+    'darjeeling': 'IXB',  # Bagdogra airport
+    'gangtok': 'IXB',  # Bagdogra airport
+    'ooty': 'CJB',  # Coimbatore airport
+    'kodaikanal': 'IXM',  # Madurai airport
+    'munnar': 'COK',  # Kochi airport
+    'mcleodganj': 'DHM',  # Dharamshala airport
+    'dharamshala': 'DHM',
+    # Beach destinations
+    'andaman': 'IXZ',
+    'varkala': 'TRV',
+    'kovalam': 'TRV',
+    'alleppey': 'COK',
+    'alappuzha': 'COK',
+    # Pilgrimage sites
+    'tirupati': 'TIR',
+    'shirdi': 'SAG',  # Shirdi airport
+    'puri': 'BBI',  # Bhubaneswar airport
+    'dwarka': 'AMD',  # Ahmedabad airport
+    'ajmer': 'KQH',  # Kishangarh airport
+    'mathura': 'AGR',  # Agra airport
+    'vrindavan': 'AGR',
+    # Other major cities
+    'surat': 'STV',
+    'rajkot': 'RAJ',
+    'vadodara': 'BDQ',
+    'baroda': 'BDQ',
+    'mysore': 'MYQ',
+    'mysuru': 'MYQ',
+    'aurangabad': 'IXU',
+    'siliguri': 'IXB',
+    'gwalior': 'GWL',
+    'bhopal': 'BHO',
+    'jabalpur': 'JLR',
+    'jammu': 'IXJ',
+    'dehri': 'GAY',  # Gaya airport
+    'bodh gaya': 'GAY',
+})
+
+# Parsed results keyed by search parameters. Fares move, so flight and offer
+# searches expire after an hour; the hotel directory barely changes.
+_flight_cache = TTLCache(maxsize=512, ttl=60 * 60)
+_hotel_offer_cache = TTLCache(maxsize=512, ttl=60 * 60)
+_hotel_directory_cache = TTLCache(maxsize=256, ttl=6 * 60 * 60)
+
+@dataclass(slots=True, frozen=True)
+class FlightOffer:
+    """A parsed Amadeus flight offer, priced in INR"""
+    airline: str
+    flight_number: str
+    departure_time: str
+    arrival_time: str
+    duration: str
+    price: float
+    currency: str
+    original_price: float
+    original_currency: str
+    seats_available: Union[int, str]
+    cabin_class: str
+    stops: int
+    is_estimate: bool = True
+
+
+@dataclass(slots=True, frozen=True)
+class HotelOffer:
+    """A parsed Amadeus hotel offer, priced per night in INR"""
+    hotel_id: str
+    name: str
+    rating: str
+    price_per_night: float
+    currency: str
+    original_price: float
+    original_currency: str
+    room_type: str
+    description: str
+    amenities: Tuple[str, ...]
+    latitude: Optional[float]
+    longitude: Optional[float]
+
+
+class _SessionResponse:
+    """The parts of an HTTPResponse the Amadeus SDK reads, backed by requests"""
+    
+    def __init__(self, response: requests.Response):
+        self.status = response.status_code
+        self._response = response
+    
+    def info(self):
+        # Case-insensitive, so the SDK's 'Content-Type' lookup always matches
+        return self._response.headers
+    
+    def read(self) -> bytes:
+        return self._response.content
+
+
+class _PooledHTTP:
+    """
+    urlopen-compatible transport for the Amadeus SDK
+
+    The SDK's default urlopen opens a new TLS connection for every call;
+    sending through one requests.Session keeps connections alive so the
+    token, flight and hotel calls reuse them.
+    """
+    
+    TIMEOUT_SECONDS = 15
+    
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=2, backoff_factor=0.3)
+        ))
+    
+    def __call__(self, request: urllib.request.Request) -> _SessionResponse:
+        response = self.session.request(
+            request.get_method(),
+            request.full_url,
+            data=request.data,
+            headers=dict(request.header_items()),
+            timeout=self.TIMEOUT_SECONDS
+        )
+        return _SessionResponse(response)
+
+
 class AmadeusService:
     """
     Service class for Amadeus API integration
@@ -38,10 +225,12 @@ class AmadeusService:
                 
             self.client = Client(
                 client_id=settings.amadeus_api_key,
-                client_secret=settings.amadeus_api_secret
+                client_secret=settings.amadeus_api_secret,
+                http=_PooledHTTP()
             )
             logger.info("Amadeus API client initialized successfully")
-            logger.debug("Key: %s...", settings.amadeus_api_key[:10])
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Key: %s...", settings.amadeus_api_key[:10])
         except Exception as e:
             logger.exception("Amadeus API initialization failed: %s", e)
             logger.debug("Error type: %s", type(e).__name__)
@@ -71,7 +260,7 @@ class AmadeusService:
         adults: int = 1,
         max_price: Optional[int] = None,
         max_results: int = 3
-    ) -> List[Dict]:
+    ) -> List[FlightOffer]:
         """
         Search for flight offers using Amadeus Flight Offers Search API
         
@@ -89,6 +278,12 @@ class AmadeusService:
         if not self.client:
             return []
         
+        cache_key = (origin, destination, departure_date, adults, max_price or 0, max_results)
+        cached = _flight_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Flight cache hit for %s -> %s on %s", origin, destination, departure_date)
+            return list(cached)
+        
         try:
             # Build search parameters
             search_params = {
@@ -106,14 +301,20 @@ class AmadeusService:
             response = self.client.shopping.flight_offers_search.get(**search_params)
             
             # Parse and format results
+            offers = response.data[:max_results]
             flights = []
-            for offer in response.data[:max_results]:
+            for offer in offers:
                 flight_data = self._parse_flight_offer(offer)
                 if flight_data:  
                     flights.append(flight_data)
             
+            dropped = len(offers) - len(flights)
+            if dropped:
+                logger.warning("Dropped %s unparseable flight offers from Amadeus", dropped)
+            
             if flights:
                 logger.info("Successfully parsed %s flights from Amadeus", len(flights))
+                _flight_cache.set(cache_key, flights)
             else:
                 logger.debug("No flights could be parsed from Amadeus response")
             
@@ -126,7 +327,7 @@ class AmadeusService:
             logger.exception("Flight search error: %s", e)
             return []
     
-    def _parse_flight_offer(self, offer: Dict) -> Optional[Dict]:
+    def _parse_flight_offer(self, offer: Dict) -> Optional[FlightOffer]:
         """
         Parse Amadeus flight offer into simplified format
         
@@ -161,26 +362,23 @@ class AmadeusService:
             
             
             # Safely extract flight details with defaults
-            flight_data = {
-                'airline': segment.get('carrierCode', 'Unknown'),
-                'flight_number': f"{segment.get('carrierCode', 'XX')}{segment.get('number', '000')}",
-                'departure_time': segment.get('departure', {}).get('at', 'N/A'),
-                'arrival_time': segment.get('arrival', {}).get('at', 'N/A'),
-                'duration': itinerary.get('duration', 'N/A'),
-                'price': price_inr,
-                'currency': 'INR',
-                'original_price': original_price,
-                'original_currency': original_currency,
-                'seats_available': offer.get('numberOfBookableSeats', 'N/A'),
-                'cabin_class': segment.get('cabin', 'ECONOMY'),  # Default to ECONOMY if not provided
-                'stops': len(itinerary['segments']) - 1,
-                'is_estimate': True  
-            }
-            
-            return flight_data
+            return FlightOffer(
+                airline=segment.get('carrierCode', 'Unknown'),
+                flight_number=f"{segment.get('carrierCode', 'XX')}{segment.get('number', '000')}",
+                departure_time=segment.get('departure', {}).get('at', 'N/A'),
+                arrival_time=segment.get('arrival', {}).get('at', 'N/A'),
+                duration=itinerary.get('duration', 'N/A'),
+                price=price_inr,
+                currency='INR',
+                original_price=original_price,
+                original_currency=original_currency,
+                seats_available=offer.get('numberOfBookableSeats', 'N/A'),
+                cabin_class=segment.get('cabin', 'ECONOMY'),  # Default to ECONOMY if not provided
+                stops=len(itinerary['segments']) - 1
+            )
             
-        except Exception as e:
-            logger.exception("Error parsing flight offer: %s", e)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            # Counted and reported once per search by the caller
             return None
     
     def get_hotels_list(
@@ -201,6 +399,12 @@ class AmadeusService:
         if not self.client:
             return []
         
+        cache_key = (city_code, max_results)
+        cached = _hotel_directory_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Hotel directory cache hit for %s", city_code)
+            return list(cached)
+        
         try:
             # Search for hotels by city 
             hotel_search_params = {
@@ -218,6 +422,7 @@ class AmadeusService:
                 return []
             
             # Parse hotel directory data
+            dropped = 0
             hotels = []
             for hotel_data in hotels_response.data[:max_results]:
                 try:
@@ -232,12 +437,14 @@ class AmadeusService:
                         'distance_unit': hotel_data.get('distance', {}).get('unit', 'KM')
                     }
                     hotels.append(hotel_info)
-                except Exception as e:
-                    logger.exception("Error parsing hotel: %s", e)
-                    continue
+                except (AttributeError, TypeError):
+                    dropped += 1
             
+            if dropped:
+                logger.warning("Dropped %s unparseable hotels from the Amadeus directory", dropped)
             if hotels:
                 logger.info("Retrieved %s real hotel names from Amadeus", len(hotels))
+                _hotel_directory_cache.set(cache_key, hotels)
             
             return hotels
             
@@ -256,7 +463,7 @@ class AmadeusService:
         adults: int = 1,
         max_price: Optional[int] = None,
         max_results: int = 10
-    ) -> List[Dict]:
+    ) -> List[HotelOffer]:
         """
         Search for hotel offers using Amadeus Hotel Search API
         
@@ -274,6 +481,12 @@ class AmadeusService:
         if not self.client:
             return []
         
+        cache_key = (city_code, check_in, check_out, adults, max_price or 0, max_results)
+        cached = _hotel_offer_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Hotel offer cache hit for %s (%s to %s)", city_code, check_in, check_out)
+            return list(cached)
+        
         try:
             # Step 1: Search for hotels by city
             hotel_search_params = {
@@ -315,14 +528,20 @@ class AmadeusService:
                 return []
             
             # Parse and format results
+            offers = offers_response.data[:max_results]
             hotels = []
-            for offer_data in offers_response.data[:max_results]:
+            for offer_data in offers:
                 hotel_data = self._parse_hotel_offer(offer_data)
                 if hotel_data:  # Only add if parsing succeeded
                     hotels.append(hotel_data)
             
+            dropped = len(offers) - len(hotels)
+            if dropped:
+                logger.warning("Dropped %s unparseable hotel offers from Amadeus", dropped)
+            
             if hotels:
                 logger.info("Successfully parsed %s hotels from Amadeus", len(hotels))
+                _hotel_offer_cache.set(cache_key, hotels)
             else:
                 logger.debug("No hotels could be parsed from Amadeus response")
             
@@ -345,7 +564,7 @@ class AmadeusService:
             logger.exception("Hotel search error: %s", e)
             return []
     
-    def _parse_hotel_offer(self, offer: Dict) -> Optional[Dict]:
+    def _parse_hotel_offer(self, offer: Dict) -> Optional[HotelOffer]:
         """
         Parse Amadeus hotel offer into simplified format
         
@@ -387,29 +606,39 @@ class AmadeusService:
             room_type_est = room_data.get('typeEstimated', {})
             room_desc = room_data.get('description', {})
             
-            hotel_data = {
-                'hotel_id': hotel.get('hotelId', 'N/A'),
-                'name': hotel.get('name', 'Unknown Hotel'),
-                'rating': hotel.get('rating', 'N/A'),
-                'price_per_night': price_inr,
-                'currency': 'INR',
-                'original_price': original_price,
-                'original_currency': original_currency,
-                'room_type': room_type_est.get('category', 'Standard'),
-                'description': room_desc.get('text', '') if room_desc else '',
-                'amenities': hotel.get('amenities', []),
-                'location': {
-                    'latitude': hotel.get('latitude'),
-                    'longitude': hotel.get('longitude')
-                }
-            }
-            
-            return hotel_data
+            return HotelOffer(
+                hotel_id=hotel.get('hotelId', 'N/A'),
+                name=hotel.get('name', 'Unknown Hotel'),
+                rating=hotel.get('rating', 'N/A'),
+                price_per_night=price_inr,
+                currency='INR',
+                original_price=original_price,
+                original_currency=original_currency,
+                room_type=room_type_est.get('category', 'Standard'),
+                description=room_desc.get('text', '') if room_desc else '',
+                amenities=tuple(hotel.get('amenities', [])),
+                latitude=hotel.get('latitude'),
+                longitude=hotel.get('longitude')
+            )
             
-        except Exception as e:
-            logger.exception("Error parsing hotel offer: %s", e)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            # Counted and reported once per search by the caller
             return None
     
+    # The SDK is blocking, so async callers get thread-backed variants they can
+    # asyncio.gather (e.g. flights and hotels together) without stalling the loop
+    async def search_flights_async(self, *args, **kwargs) -> List[FlightOffer]:
+        """Async variant of search_flights; same arguments and result"""
+        return await asyncio.to_thread(self.search_flights, *args, **kwargs)
+    
+    async def get_hotels_list_async(self, *args, **kwargs) -> List[Dict]:
+        """Async variant of get_hotels_list; same arguments and result"""
+        return await asyncio.to_thread(self.get_hotels_list, *args, **kwargs)
+    
+    async def search_hotels_async(self, *args, **kwargs) -> List[HotelOffer]:
+        """Async variant of search_hotels; same arguments and result"""
+        return await asyncio.to_thread(self.search_hotels, *args, **kwargs)
+    
     def get_city_code(self, city_name: str) -> Optional[str]:
         """
         Get IATA city code from city name
@@ -420,101 +649,17 @@ class AmadeusService:
         Returns:
             IATA code or None
         """
-        # Common Indian city codes
-        city_codes = {
-            'delhi': 'DEL',
-            'new delhi': 'DEL',
-            'mumbai': 'BOM',
-            'bangalore': 'BLR',
-            'bengaluru': 'BLR',
-            'chennai': 'MAA',
-            'kolkata': 'CCU',
-            'hyderabad': 'HYD',
-            'pune': 'PNQ',
-            'ahmedabad': 'AMD',
-            'jaipur': 'JAI',
-            'goa': 'GOI',
-            'kochi': 'COK',
-            'cochin': 'COK',
-            'lucknow': 'LKO',
-            'thiruvananthapuram': 'TRV',
-            'trivandrum': 'TRV',
-            'chandigarh': 'IXC',
-            'indore': 'IDR',
-            'bhubaneswar': 'BBI',
-            'raipur': 'RPR',
-            'ranchi': 'IXR',
-            'patna': 'PAT',
-            'varanasi': 'VNS',
-            'banaras': 'VNS',
-            'agra': 'AGR',
-            'srinagar': 'SXR',
-            'amritsar': 'ATQ',
-            'guwahati': 'GAU',
-            'mangalore': 'IXE',
-            'vijayawada': 'VGA',
-            'coimbatore': 'CJB',
-            'madurai': 'IXM',
-            'visakhapatnam': 'VTZ',
-            'vizag': 'VTZ',
-            'nagpur': 'NAG',
-            'udaipur': 'UDR',
-            'jodhpur': 'JDH',
-            'shimla': 'SLV',
-            'manali': 'KUU',
-            'leh': 'IXL',
-            'port blair': 'IXZ',
-            'imphal': 'IMF',
-            'aizawl': 'AJL',
-            'pondicherry': 'PNY',
-            'puducherry': 'PNY',
-            # Hill stations and tourist destinations
-            'dehradun': 'DED',
-            'mussoorie': 'DED',  # Nearest airport is Dehradun
-            'rishikesh': 'DED',  # Nearest airport is Dehradun
-            'haridwar': 'DED',  # Nearest airport is Dehradun
-            'nainital': 'PGH',  # Pantnagar airport
-            'darjeeling': 'IXB',  # Bagdogra airport
-            'gangtok': 'IXB',  # Bagdogra airport
-            'ooty': 'CJB',  # Coimbatore airport
-            'kodaikanal': 'IXM',  # Madurai airport
-            'munnar': 'COK',  # Kochi airport
-            'mcleodganj': 'DHM',  # Dharamshala airport
-            'dharamshala': 'DHM',
-            # Beach destinations
-            'andaman': 'IXZ',
-            'varkala': 'TRV',
-            'kovalam': 'TRV',
-            'alleppey': 'COK',
-            'alappuzha': 'COK',
-            # Pilgrimage sites
-            'tirupati': 'TIR',
-            'shirdi': 'SAG',  # Shirdi airport
-            'puri': 'BBI',  # Bhubaneswar airport
-            'dwarka': 'AMD',  # Ahmedabad airport
-            'ajmer': 'KQH',  # Kishangarh airport
-            'mathura': 'AGR',  # Agra airport
-            'vrindavan': 'AGR',
-            # Other major cities
-            'surat': 'STV',
-            'rajkot': 'RAJ',
-            'vadodara': 'BDQ',
-            'baroda': 'BDQ',
-            'mysore': 'MYQ',
-            'mysuru': 'MYQ',
-            'aurangabad': 'IXU',
-            'siliguri': 'IXB',
-            'gwalior': 'GWL',
-            'bhopal': 'BHO',
-            'jabalpur': 'JLR',
-            'jammu': 'IXJ',
-            'dehri': 'GAY',  # Gaya airport
-            'bodh gaya': 'GAY',
-        }
-        
-        city_lower = city_name.lower().strip()
-        return city_codes.get(city_lower)
+        return _CITY_CODES.get(city_name.lower().strip())
+
+
+@functools.cache
+def get_amadeus_service() -> AmadeusService:
+    """Shared service instance, created on first use rather than at import"""
+    return AmadeusService()
 
 
-# Singleton instance
-amadeus_service = AmadeusService()
+def __getattr__(name: str):
+    # `amadeus_service` is built on first access so importing the module stays cheap
+    if name == "amadeus_service":
+        return get_amadeus_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
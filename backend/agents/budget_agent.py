@@ -3,8 +3,45 @@ import logging
 from typing import Dict, List
 from models.schemas import TripRequest, BudgetResponse, BudgetBreakdown
 from config import settings
-from datetime import datetime, date
+from utils.cache import TTLCache
+import functools
 import json
+import math
+
+# AI tips are generic enough to share across similar trips, so they are cached
+# per destination, trip type, length bucket and budget order of magnitude
+_tips_cache = TTLCache(maxsize=1024, ttl=24 * 60 * 60)
+
+
+def _day_bucket(days: int) -> str:
+    if days <= 3:
+        return "1-3"
+    if days <= 7:
+        return "4-7"
+    if days <= 14:
+        return "8-14"
+    return "15+"
+
+
+@functools.cache
+def _get_model() -> genai.GenerativeModel:
+    """One configured model per process, however many agents are created"""
+    genai.configure(api_key=settings.google_ai_api_key)
+    # A non-thinking model: 2.5-flash spends part of max_output_tokens on thinking,
+    # which a tight cap would leave no room for the tips themselves
+    return genai.GenerativeModel(
+        'gemini-2.0-flash-lite',
+        generation_config={
+            'temperature': 0.7,
+            'max_output_tokens': 80,
+        },
+        safety_settings={
+            'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+            'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+            'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+            'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'
+        }
+    )
 
 
 class BudgetAgent:
@@ -14,20 +51,7 @@ class BudgetAgent:
     """
     
     def __init__(self):
-        genai.configure(api_key=settings.google_ai_api_key)
-        self.model = genai.GenerativeModel(
-            'gemini-2.5-flash',
-            generation_config={
-                'temperature': 0.7,
-                'max_output_tokens': 200,
-            },
-            safety_settings={
-                'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-                'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'
-            }
-        )
+        self.model = _get_model()
         
         # Base allocation percentages for different trip types
         self.trip_type_allocations = {
@@ -67,33 +91,31 @@ class BudgetAgent:
                 "misc": 5
             }
         }
+        # (display name, fraction, percentage) per category, derived once from the table above
+        self._allocation_rows = {
+            name: tuple(
+                (category.capitalize(), percentage / 100, percentage)
+                for category, percentage in allocation.items()
+            )
+            for name, allocation in self.trip_type_allocations.items()
+        }
         self.logger = logging.getLogger(__name__)
     
     def allocate_budget(self, trip_request: TripRequest) -> BudgetResponse:
         """
         Allocate budget based on trip type and use AI for recommendations
         """
-        trip_type = trip_request.trip_type.lower()
+        trip_type = trip_request.trip_type
         total_budget = trip_request.budget
         
-        # Get base allocation percentages
-        if trip_type in self.trip_type_allocations:
-            allocation = self.trip_type_allocations[trip_type]
-        else:
-            # Default allocation
-            allocation = self.trip_type_allocations["family"]
+        # Get base allocation percentages (family is the default)
+        rows = self._allocation_rows.get(trip_type) or self._allocation_rows["family"]
         
         # Calculate actual amounts
-        breakdown = []
-        for category, percentage in allocation.items():
-            value = (percentage / 100) * total_budget
-            breakdown.append(
-                BudgetBreakdown(
-                    name=category.capitalize(),
-                    value=round(value, 2),
-                    percentage=percentage
-                )
-            )
+        breakdown = [
+            BudgetBreakdown(name=name, value=round(fraction * total_budget, 2), percentage=percentage)
+            for name, fraction, percentage in rows
+        ]
         
         # Get AI recommendations
         recommendations = self._get_ai_recommendations(trip_request, breakdown)
@@ -108,13 +130,19 @@ class BudgetAgent:
         """
         Use AI to generate personalized budget recommendations
         """
-        # Convert dates to date objects if they're strings
-        start_date = trip_request.start_date if isinstance(trip_request.start_date, date) else datetime.fromisoformat(trip_request.start_date).date()
-        end_date = trip_request.end_date if isinstance(trip_request.end_date, date) else datetime.fromisoformat(trip_request.end_date).date()
+        days = (trip_request.end_date - trip_request.start_date).days
         
-        days = (end_date - start_date).days
+        cache_key = (
+            trip_request.destination.strip().lower(),
+            trip_request.trip_type,
+            _day_bucket(days),
+            int(math.log10(max(trip_request.budget, 1)))
+        )
+        cached_tips = _tips_cache.get(cache_key)
+        if cached_tips is not None:
+            return cached_tips
         
-        prompt = f"""Give 3 budget tips for a {days}-day {trip_request.trip_type} trip to {trip_request.destination} with {trip_request.budget} rupees budget."""
+        prompt = f"""List exactly 3 budget tips as "• " bullets, at most 12 words each, no preamble, for a {days}-day {trip_request.trip_type} trip to {trip_request.destination} on ₹{trip_request.budget:,.0f}."""
         
         try:
             response = self.model.generate_content(
@@ -123,13 +151,18 @@ class BudgetAgent:
             )
             
             # Check if response has text
+            tips = None
             if hasattr(response, 'text') and response.text:
-                return response.text.strip()
+                tips = response.text.strip()
             elif response.candidates and len(response.candidates) > 0:
                 # Try to get text from first candidate
                 candidate = response.candidates[0]
                 if hasattr(candidate.content, 'parts') and candidate.content.parts:
-                    return candidate.content.parts[0].text.strip()
+                    tips = candidate.content.parts[0].text.strip()
+            
+            if tips:
+                _tips_cache.set(cache_key, tips)
+                return tips
             
             # If no valid response, use fallback
             raise Exception("No valid response from AI")
@@ -139,5 +172,14 @@ class BudgetAgent:
             return f"• Book accommodation early in {trip_request.destination}\n• Use local transport to save costs\n• Try local restaurants for authentic food\n• Reserve ₹{breakdown[2].value:.0f} for activities"
 
 
-# Initialize agent instance
-budget_agent = BudgetAgent()
+@functools.cache
+def get_budget_agent() -> BudgetAgent:
+    """Shared agent instance, created on first use rather than at import"""
+    return BudgetAgent()
+
+
+def __getattr__(name: str):
+    # `budget_agent` is built on first access so importing the module stays cheap
+    if name == "budget_agent":
+        return get_budget_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,13 +7,29 @@ from models.schemas import (
     TripRequest, BudgetResponse, 
     HotelSearchRequest, HotelSearchResponse,
     TransportSearchRequest, TransportSearchResponse,
-    ItineraryRequest, ItineraryResponse
+    ItineraryRequest, ItineraryResponse, DayPlan
 )
 from agents.budget_agent_v2 import enhanced_budget_agent
-from agents.hotel_agent import hotel_agent
-from agents.transport_agent import transport_agent
-from agents.activities_agent import activities_agent
+from dataclasses import dataclass
+import asyncio
 import logging
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from agents.activities_agent import ActivitiesAgent
+    from agents.hotel_agent import HotelAgent
+    from agents.transport_agent import TransportAgent
+
+
+@dataclass(slots=True, frozen=True)
+class PipelineCtx:
+    """Budget constraints from process_budget that the later steps apply"""
+    trip_request: TripRequest
+    hotel_budget_per_night: float
+    transport_budget: float
+    activities_budget: float
+    activities_budget_per_day: float
+    pipeline_data: Dict
 
 
 class AgentCoordinator:
@@ -21,30 +37,51 @@ class AgentCoordinator:
     Coordinates all agents with proper budget pipeline
     """
     
+    __slots__ = ("budget_agent", "pipeline_context", "logger")
+    
     def __init__(self):
         self.budget_agent = enhanced_budget_agent
-        self.hotel_agent = hotel_agent
-        self.transport_agent = transport_agent
-        self.activities_agent = activities_agent
-        self.pipeline_context = {}
+        self.pipeline_context: Optional[PipelineCtx] = None
         self.logger = logging.getLogger(__name__)
     
+    # The downstream agents pull in Gemini and HTTP clients, so they are imported on
+    # first use; a worker that only serves budget requests never loads them
+    @property
+    def hotel_agent(self) -> "HotelAgent":
+        from agents.hotel_agent import get_hotel_agent
+        return get_hotel_agent()
+    
+    @property
+    def transport_agent(self) -> "TransportAgent":
+        from agents.transport_agent import transport_agent
+        return transport_agent
+    
+    @property
+    def activities_agent(self) -> "ActivitiesAgent":
+        from agents.activities_agent import get_activities_agent
+        return get_activities_agent()
+    
     def process_budget(self, trip_request: TripRequest) -> dict:
         """
         Step 1: Process budget and store pipeline data
         """
         result = self.budget_agent.allocate_budget(trip_request)
+        pipeline_data = result["pipeline_data"]
         
         # Store pipeline data for other agents
-        self.pipeline_context = {
-            "trip_request": trip_request,
-            **result["pipeline_data"]
-        }
+        self.pipeline_context = ctx = PipelineCtx(
+            trip_request=trip_request,
+            hotel_budget_per_night=pipeline_data["hotel_budget_per_night"],
+            transport_budget=pipeline_data["transport_budget"],
+            activities_budget=pipeline_data["activities_budget"],
+            activities_budget_per_day=pipeline_data["activities_budget_per_day"],
+            pipeline_data=pipeline_data
+        )
         
         self.logger.info("Budget Pipeline Set")
-        self.logger.debug("  - Hotel budget per night: ₹%s", f"{result['pipeline_data']['hotel_budget_per_night']:.2f}")
-        self.logger.debug("  - Activities budget per day: ₹%s", f"{result['pipeline_data']['activities_budget_per_day']:.2f}")
-        self.logger.debug("  - Transport budget: ₹%s", f"{result['pipeline_data']['transport_budget']:.2f}")
+        self.logger.debug("  - Hotel budget per night: ₹%.2f", ctx.hotel_budget_per_night)
+        self.logger.debug("  - Activities budget per day: ₹%.2f", ctx.activities_budget_per_day)
+        self.logger.debug("  - Transport budget: ₹%.2f", ctx.transport_budget)
         
         return result
     
@@ -52,76 +89,144 @@ class AgentCoordinator:
         """
         Step 2: Search hotels within budget constraints
         """
-        if not self.pipeline_context:
+        ctx = self.pipeline_context
+        if ctx is None:
             raise Exception("Budget must be processed first. Call process_budget() before search_hotels().")
         
-        # Get hotel budget per night from pipeline
-        max_price_per_night = self.pipeline_context.get("hotel_budget_per_night", request.max_price)
+        # Override max_price with the budget-constrained per-night value
+        request.max_price = min(request.max_price, ctx.hotel_budget_per_night)
         
-        # Override max_price with budget-constrained value
-        request.max_price = min(request.max_price, max_price_per_night)
-        
-        self.logger.debug("Searching hotels with max price: ₹%s/night (from budget allocation)", f"{request.max_price:.2f}")
+        self.logger.debug("Searching hotels with max price: ₹%.2f/night (from budget allocation)", request.max_price)
         
         return self.hotel_agent.search_hotels(request)
     
+    async def search_hotels_async(self, request: HotelSearchRequest) -> HotelSearchResponse:
+        """
+        Step 2, for callers on the event loop
+        """
+        ctx = self.pipeline_context
+        if ctx is None:
+            raise Exception("Budget must be processed first. Call process_budget() before search_hotels().")
+        
+        request.max_price = min(request.max_price, ctx.hotel_budget_per_night)
+        
+        self.logger.debug("Searching hotels with max price: ₹%.2f/night (from budget allocation)", request.max_price)
+        
+        return await self.hotel_agent.search_hotels_async(request)
+    
     def search_transport(self, request: TransportSearchRequest) -> TransportSearchResponse:
         """
         Step 3: Search transport within budget constraints
         """
-        if not self.pipeline_context:
+        ctx = self.pipeline_context
+        if ctx is None:
             raise Exception("Budget must be processed first. Call process_budget() before search_transport().")
         
-        # Get transport budget from pipeline
-        transport_budget = self.pipeline_context.get("transport_budget", request.budget_allocation)
-        
         # Override budget_allocation with pipeline value
-        request.budget_allocation = transport_budget
+        request.budget_allocation = ctx.transport_budget
         
-        self.logger.debug("Searching transport with budget: ₹%s (from budget allocation)", f"{request.budget_allocation:.2f}")
+        self.logger.debug("Searching transport with budget: ₹%.2f (from budget allocation)", request.budget_allocation)
         
         return self.transport_agent.search_transport(request)
     
-    def generate_itinerary(self, request: ItineraryRequest) -> ItineraryResponse:
+    async def generate_itinerary(self, request: ItineraryRequest) -> ItineraryResponse:
         """
         Step 4: Generate itinerary within activity budget constraints
         """
-        if not self.pipeline_context:
+        result, _ = await self.generate_itinerary_json(request)
+        return result
+    
+    async def generate_itinerary_json(self, request: ItineraryRequest) -> Tuple[ItineraryResponse, bytes]:
+        """
+        Step 4, also returning the encoded JSON body for the API layer
+        """
+        ctx = self.pipeline_context
+        if ctx is None:
             raise Exception("Budget must be processed first. Call process_budget() before generate_itinerary().")
         
         # Get activities budget from pipeline
-        activities_budget = self.pipeline_context.get("activities_budget", request.budget_allocation)
-        activities_budget_per_day = self.pipeline_context.get("activities_budget_per_day", 0)
+        activities_budget = ctx.activities_budget
+        activities_budget_per_day = ctx.activities_budget_per_day
         
         # Override budget_allocation with pipeline value
         request.budget_allocation = activities_budget
         
         self.logger.info("Generating itinerary for budgeted activities")
-        self.logger.debug("  - Total activities budget: ₹%s", f"{activities_budget:.2f}")
-        self.logger.debug("  - Per day budget: ₹%s", f"{activities_budget_per_day:.2f}")
+        self.logger.debug("  - Total activities budget: ₹%.2f", activities_budget)
+        self.logger.debug("  - Per day budget: ₹%.2f", activities_budget_per_day)
         
         # Generate itinerary with budget constraint
-        result = self.activities_agent.generate_itinerary(request)
+        result, payload = await self.activities_agent.generate_itinerary_json(request)
         
         # Validate that total cost doesn't exceed budget
         if result.total_activities_cost > activities_budget:
-            self.logger.warning("Itinerary cost (₹%s) exceeds budget (₹%s)", f"{result.total_activities_cost:.2f}", f"{activities_budget:.2f}")
+            self.logger.warning("Itinerary cost (₹%.2f) exceeds budget (₹%.2f)", result.total_activities_cost, activities_budget)
             self.logger.info("Adjusting activities to fit budget")
             # Optionally regenerate with stricter constraints
         
-        return result
+        return result, payload
+    
+    async def stream_itinerary(self, request: ItineraryRequest) -> AsyncIterator[DayPlan]:
+        """
+        Step 4 (streaming): yield itinerary days within the activity budget
+        """
+        if self.pipeline_context is not None:
+            request.budget_allocation = self.pipeline_context.activities_budget
+        
+        async for day_plan in self.activities_agent.stream_itinerary(request):
+            yield day_plan
+    
+    async def run_pipeline(
+        self,
+        trip_request: TripRequest,
+        hotel_request: HotelSearchRequest,
+        transport_request: TransportSearchRequest,
+        itinerary_request: ItineraryRequest
+    ) -> dict:
+        """
+        Run all four steps for one trip, reading the budget pipeline only once
+        """
+        result = self.process_budget(trip_request)
+        ctx = self.pipeline_context
+        
+        # Apply every budget constraint up front, then dispatch to the agents
+        hotel_request.max_price = min(hotel_request.max_price, ctx.hotel_budget_per_night)
+        transport_request.budget_allocation = ctx.transport_budget
+        activities_budget = ctx.activities_budget
+        itinerary_request.budget_allocation = activities_budget
+        
+        # The three searches only depend on the budget, so run them concurrently;
+        # the transport agent blocks on HTTP and goes to a worker thread
+        hotels, transport, (itinerary, _) = await asyncio.gather(
+            self.hotel_agent.search_hotels_async(hotel_request),
+            asyncio.to_thread(self.transport_agent.search_transport, transport_request),
+            self.activities_agent.generate_itinerary_json(itinerary_request)
+        )
+        
+        if itinerary.total_activities_cost > activities_budget:
+            self.logger.warning("Itinerary cost (₹%.2f) exceeds budget (₹%.2f)", itinerary.total_activities_cost, activities_budget)
+        
+        return {
+            "budget": result["budget_response"],
+            "hotels": hotels,
+            "transport": transport,
+            "itinerary": itinerary
+        }
     
     def get_pipeline_summary(self) -> dict:
         """
         Get summary of current pipeline state
         """
-        return self.pipeline_context
+        ctx = self.pipeline_context
+        if ctx is None:
+            return {}
+        return {"trip_request": ctx.trip_request, **ctx.pipeline_data}
     
     def reset_pipeline(self):
         """
         Reset pipeline context
         """
-        self.pipeline_context = {}
+        self.pipeline_context = None
         self.logger.info("Pipeline reset")
 
 
@@ -1,12 +1,246 @@
 import google.generativeai as genai
+import asyncio
+import functools
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from models.schemas import HotelSearchRequest, HotelSearchResponse, Hotel
 from config import settings
-import json
+import orjson
 import random
+import re
 import requests
+import time
+from requests.adapters import HTTPAdapter
 from datetime import datetime
+from types import MappingProxyType
+from utils.cache import TTLCache
+from utils.rate_limit import retry_after_seconds
+
+RAPIDAPI_HOST = "booking-com.p.rapidapi.com"
+
+# RapidAPI responses worth retrying, and how hard to try before giving up
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 4
+MAX_BACKOFF_SECONDS = 8
+# User-facing messages for RapidAPI statuses that need explaining
+_ERROR_MESSAGES = MappingProxyType({
+    403: "❌ API Key Invalid or Subscription Required. Visit: https://rapidapi.com/apidojo/api/booking",
+    429: "⚠️ Rate Limit Exceeded (500 requests/month). Try again later or upgrade plan."
+})
+# After repeated 429s, stop calling RapidAPI for a while instead of burning quota
+RATE_LIMIT_COOLDOWN_SECONDS = 60
+
+# Common facility mappings, in the order they are listed
+_FACILITY_KEYS = (
+    ("wifi", "Free WiFi"),
+    ("pool", "Swimming Pool"),
+    ("gym", "Fitness Center"),
+    ("spa", "Spa"),
+    ("restaurant", "Restaurant"),
+    ("bar", "Bar"),
+    ("parking", "Free Parking"),
+    ("breakfast", "Breakfast Included"),
+    ("ac", "Air Conditioning"),
+    ("room service", "Room Service")
+)
+# Lookahead so overlapping keys are all found, like the substring checks they replace
+_FACILITY_RE = re.compile("(?=(" + "|".join(re.escape(key) for key, _ in _FACILITY_KEYS) + "))")
+_DEFAULT_FACILITIES = ("WiFi", "Air Conditioning", "Room Service")
+
+# Destination name -> (dest_id, dest_type); these rarely change
+_location_cache = TTLCache(maxsize=1024, ttl=24 * 60 * 60)
+# Raw hotel search results, short-lived so prices stay fresh
+_hotel_search_cache = TTLCache(maxsize=256, ttl=15 * 60)
+# Generated fallback hotels per (destination, nightly cap, trip type)
+_fallback_cache = TTLCache(maxsize=256, ttl=5 * 60)
+
+# Static data for generated hotels, built once at import rather than per call
+
+# Real Indian hotel chains and properties with more realistic price ranges
+_HOTEL_CHAINS = MappingProxyType({
+    "luxury": (
+        {"name": "Taj Palace", "base_price": 9500, "variance": 0.25, "rating": 4.7},
+        {"name": "The Oberoi", "base_price": 13500, "variance": 0.20, "rating": 4.8},
+        {"name": "ITC Grand", "base_price": 10200, "variance": 0.22, "rating": 4.6},
+        {"name": "Leela Palace", "base_price": 12800, "variance": 0.18, "rating": 4.8},
+        {"name": "JW Marriott", "base_price": 8200, "variance": 0.28, "rating": 4.6},
+        {"name": "The Ritz-Carlton", "base_price": 15000, "variance": 0.20, "rating": 4.9},
+    ),
+    "premium": (
+        {"name": "Hyatt Regency", "base_price": 6200, "variance": 0.30, "rating": 4.5},
+        {"name": "Radisson Blu", "base_price": 5100, "variance": 0.35, "rating": 4.4},
+        {"name": "Novotel", "base_price": 4600, "variance": 0.32, "rating": 4.3},
+        {"name": "Holiday Inn", "base_price": 3900, "variance": 0.38, "rating": 4.2},
+        {"name": "Crowne Plaza", "base_price": 5700, "variance": 0.28, "rating": 4.4},
+        {"name": "Courtyard by Marriott", "base_price": 4800, "variance": 0.33, "rating": 4.3},
+    ),
+    "midrange": (
+        {"name": "Lemon Tree Hotel", "base_price": 2800, "variance": 0.40, "rating": 4.0},
+        {"name": "Ginger Hotel", "base_price": 2200, "variance": 0.45, "rating": 3.9},
+        {"name": "Treebo Hotels", "base_price": 1950, "variance": 0.48, "rating": 3.8},
+        {"name": "FabHotel", "base_price": 1650, "variance": 0.50, "rating": 3.7},
+        {"name": "Bloom Hotel", "base_price": 2450, "variance": 0.42, "rating": 4.0},
+        {"name": "Keys Hotels", "base_price": 3100, "variance": 0.38, "rating": 4.1},
+    ),
+    "budget": (
+        {"name": "OYO Flagship", "base_price": 1350, "variance": 0.55, "rating": 3.5},
+        {"name": "Collection O", "base_price": 1150, "variance": 0.60, "rating": 3.6},
+        {"name": "Zostel", "base_price": 850, "variance": 0.35, "rating": 4.2},
+        {"name": "GoStays", "base_price": 980, "variance": 0.58, "rating": 3.4},
+        {"name": "Spot ON", "base_price": 1220, "variance": 0.52, "rating": 3.5},
+        {"name": "Capital O", "base_price": 1450, "variance": 0.48, "rating": 3.7},
+    )
+})
+
+
+def _chain_mix(*weighted_categories) -> Tuple[tuple, tuple]:
+    """Flatten (category, weight) pairs into random.sample's population and counts"""
+    population = []
+    counts = []
+    for category, weight in weighted_categories:
+        population.extend(_HOTEL_CHAINS[category])
+        counts.extend([weight] * len(_HOTEL_CHAINS[category]))
+    return tuple(population), tuple(counts)
+
+
+# (budget above which it applies, chains, copies of each chain) from high to low budget
+_CHAIN_MIX_BY_BUDGET = tuple((threshold, *_chain_mix(*mix)) for threshold, mix in (
+    # High budget - mix of luxury and premium
+    (8000, (("luxury", 2), ("premium", 2), ("midrange", 1))),
+    # Medium-high budget - premium and midrange
+    (4000, (("premium", 3), ("midrange", 2), ("budget", 1))),
+    # Medium budget - midrange focused
+    (2000, (("midrange", 3), ("premium", 1), ("budget", 2))),
+    # Low budget - budget and economy midrange
+    (float("-inf"), (("budget", 3), ("midrange", 2)))
+))
+
+# Hotel photos on a stable image CDN, cycled through by index
+_HOTEL_IMAGES = (
+    "https://images.unsplash.com/photo-1566073771259-6a8506099945?w=800",  # Luxury hotel
+    "https://images.unsplash.com/photo-1542314831-068cd1dbfeeb?w=800",  # Hotel room
+    "https://images.unsplash.com/photo-1445019980597-93fa8acb246c?w=800",  # Modern hotel
+    "https://images.unsplash.com/photo-1551882547-ff40c63fe5fa?w=800",  # Resort pool
+    "https://images.unsplash.com/photo-1582719508461-905c673771fd?w=800",  # Hotel exterior
+    "https://images.unsplash.com/photo-1571896349842-33c89424de2d?w=800",  # Hotel lobby
+    "https://images.unsplash.com/photo-1564501049412-61c2a3083791?w=800",  # Beach resort
+    "https://images.unsplash.com/photo-1520250497591-112f2f40a3f4?w=800",  # Hotel interior
+    "https://images.unsplash.com/photo-1584132967334-10e028bd69f7?w=800",  # Boutique hotel
+    "https://images.unsplash.com/photo-1512918728675-ed5a9ecdebfd?w=800",  # Bedroom
+    "https://images.unsplash.com/photo-1611892440504-42a792e24d32?w=800",  # Modern room
+    "https://images.unsplash.com/photo-1631049307264-da0ec9d70304?w=800",  # Hotel view
+    "https://images.unsplash.com/photo-1618773928121-c32242e63f39?w=800",  # Luxury suite
+    "https://images.unsplash.com/photo-1590490360182-c33d57733427?w=800",  # Resort
+    "https://images.unsplash.com/photo-1455587734955-081b22074882?w=800",  # Hotel building
+)
+
+# Neighbourhoods to place generated hotels in, by destination
+_LOCATIONS = MappingProxyType({
+    "goa": ("Calangute", "Baga Beach", "Anjuna", "Candolim", "Panjim"),
+    "mumbai": ("Colaba", "Bandra", "Andheri", "Powai", "Lower Parel"),
+    "delhi": ("Connaught Place", "Aerocity", "Karol Bagh", "Paharganj", "Dwarka"),
+    "bangalore": ("MG Road", "Whitefield", "Indiranagar", "Koramangala", "Electronic City"),
+    "bengaluru": ("MG Road", "Whitefield", "Indiranagar", "Koramangala", "Electronic City"),
+    "chennai": ("T Nagar", "Anna Salai", "Egmore", "Mylapore", "OMR"),
+    "jaipur": ("City Palace Area", "MI Road", "Bani Park", "Malviya Nagar", "Vaishali Nagar"),
+    "vellore": ("Katpadi", "Fort Area", "Gandhi Nagar", "CMC Campus", "Sathuvachari"),
+    "puducherry": ("White Town", "Beach Road", "Auroville", "French Quarter", "Promenade"),
+    "pondicherry": ("White Town", "Beach Road", "Auroville", "French Quarter", "Promenade"),
+    "default": ("City Center", "Downtown", "Near Station", "Airport Road", "Main Street")
+})
+
+_AMENITIES_POOL = (
+    ("Free WiFi", "Swimming Pool", "Gym", "Restaurant", "Room Service"),
+    ("Free WiFi", "Parking", "Restaurant", "24/7 Front Desk"),
+    ("Free WiFi", "Complimentary Breakfast", "AC Rooms", "TV"),
+    ("WiFi", "Hot Water", "Clean Rooms", "Laundry Service"),
+    ("Free WiFi", "Bar", "Spa", "Conference Room", "Airport Shuttle"),
+    ("WiFi", "Rooftop Restaurant", "Gym", "Pool", "Concierge"),
+)
+
+_TAGS_MAPPING = MappingProxyType({
+    "luxury": "Luxury Pick",
+    "premium": "Best Value",
+    "midrange": "Family Friendly",
+    "budget": "Budget Friendly"
+})
+
+# Destination price multipliers (some cities are more expensive)
+_DESTINATION_MULTIPLIERS = MappingProxyType({
+    "mumbai": 1.3,
+    "delhi": 1.2,
+    "bangalore": 1.25,
+    "bengaluru": 1.25,
+    "goa": 1.4,
+    "jaipur": 0.9,
+    "chennai": 1.1,
+    "puducherry": 0.95,
+    "pondicherry": 0.95,
+    "vellore": 0.75,
+    "default": 1.0
+})
+
+# Trip type multipliers
+_TRIP_MULTIPLIERS = MappingProxyType({
+    "luxurious": 1.35,
+    "adventure": 1.0,
+    "budget": 0.75,
+    "family": 1.15,
+    "romantic": 1.25,
+    "business": 1.2
+})
+
+
+# Instructions shared by every AI hotel request; the request details are appended
+_HOTEL_PROMPT = """Generate 15 real hotels in the destination below as a JSON array.
+
+Use REAL Indian hotel chains: Taj, Oberoi, ITC, Leela, Marriott, Hyatt, Radisson, Novotel, Lemon Tree, Ginger, Treebo, FabHotel, OYO
+
+Format:
+[{"name":"Taj Palace Delhi","price":2500,"rating":4.2,"location":"Connaught Place","amenities":["WiFi","Pool","Gym"],"description":"Luxury hotel in city center","tag":"Luxury Pick"}]
+
+Rules:
+- Use real hotel chain names + city
+- price: number from 800 up to the price ceiling
+- rating: 3.5-4.8
+- tag: "Luxury Pick","Budget Friendly","Family Friendly","Best Value"
+- description: max 80 chars
+- 15 hotels only
+"""
+
+
+class HotelAPIError(Exception):
+    """A RapidAPI hotel request failed with an HTTP error status"""
+
+    def __init__(self, status_code: int, message: str, response: Optional[requests.Response] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+    @property
+    def retryable(self) -> bool:
+        """True for rate limits and server errors, False for e.g. a bad API key"""
+        return self.status_code in RETRY_STATUSES
+
+
+@functools.cache
+def _get_model() -> genai.GenerativeModel:
+    """One configured model per process, built on first use"""
+    genai.configure(api_key=settings.google_ai_api_key)
+    return genai.GenerativeModel(
+        'gemini-2.5-flash',
+        generation_config={
+            'temperature': 0.8,
+            'max_output_tokens': 4000,
+            'response_mime_type': 'application/json'
+        },
+        safety_settings={
+            'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+            'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+            'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+            'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'
+        }
+    )
 
 
 class HotelAgent:
@@ -16,20 +250,6 @@ class HotelAgent:
     """
     
     def __init__(self):
-        genai.configure(api_key=settings.google_ai_api_key)
-        self.model = genai.GenerativeModel(
-            'gemini-2.5-flash',
-            generation_config={
-                'temperature': 0.8,
-                'max_output_tokens': 4000,
-            },
-            safety_settings={
-                'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-                'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'
-            }
-        )
         self.rapidapi_key = getattr(settings, 'rapidapi_key', None)
         self.logger = logging.getLogger(__name__)
         
@@ -38,6 +258,23 @@ class HotelAgent:
             self.logger.debug("RapidAPI key present (masked)")
         else:
             self.logger.warning("No RapidAPI key found in settings")
+        
+        # One session for the agent's lifetime so the locations and search calls
+        # (and later requests) reuse the same keep-alive HTTPS connection
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+        if self.rapidapi_key:
+            self.session.headers.update({
+                "X-RapidAPI-Key": self.rapidapi_key,
+                "X-RapidAPI-Host": RAPIDAPI_HOST
+            })
+        self._consecutive_429s = 0
+        self._cooldown_until = 0.0
+    
+    @property
+    def model(self) -> genai.GenerativeModel:
+        # Only AI hotel generation needs Gemini, so the client is built on first use
+        return _get_model()
     
     def search_hotels(self, request: HotelSearchRequest) -> HotelSearchResponse:
         """
@@ -45,6 +282,38 @@ class HotelAgent:
         1. Get REAL hotel names/locations from Amadeus
         2. Generate realistic AI pricing based on hotel tier and location
         """
+        self._log_request(request)
+        nights = (request.check_out - request.check_in).days
+        hotels = self._search_amadeus_hotels(request, nights)
+        if hotels:
+            return HotelSearchResponse(hotels=hotels, total_count=len(hotels))
+        return self._fallback_response(request, nights)
+    
+    async def search_hotels_async(self, request: HotelSearchRequest) -> HotelSearchResponse:
+        """
+        Async variant of search_hotels for callers already on the event loop
+
+        Only the blocking Amadeus lookup goes to a worker thread; the fallback
+        is generated locally and cheap enough to build on the loop. A slow
+        Amadeus lookup is abandoned after settings.amadeus_hotel_timeout.
+        """
+        self._log_request(request)
+        nights = (request.check_out - request.check_in).days
+        try:
+            hotels = await asyncio.wait_for(
+                asyncio.to_thread(self._search_amadeus_hotels, request, nights),
+                timeout=settings.amadeus_hotel_timeout
+            )
+        except asyncio.TimeoutError:
+            # The worker thread still finishes and fills the Amadeus directory cache,
+            # so the next search for this city is fast
+            self.logger.warning("Amadeus hotel lookup for %s timed out after %.1fs", request.destination, settings.amadeus_hotel_timeout)
+            hotels = []
+        if hotels:
+            return HotelSearchResponse(hotels=hotels, total_count=len(hotels))
+        return self._fallback_response(request, nights)
+    
+    def _log_request(self, request: HotelSearchRequest) -> None:
         # Debug: print incoming request summary for troubleshooting
         try:
             self.logger.debug("Hotel search requested: %s", {
@@ -59,6 +328,11 @@ class HotelAgent:
         except Exception:
             # Safe fallback logging
             self.logger.debug("Hotel search requested: destination=%s max_price=%s", request.destination, request.max_price)
+    
+    def _search_amadeus_hotels(self, request: HotelSearchRequest, nights: int) -> List[Hotel]:
+        """
+        Real hotel names from Amadeus with generated pricing; empty if unavailable
+        """
         # Try Amadeus API for real hotel names and locations
         try:
             from agents.amadeus_integration import amadeus_service
@@ -79,7 +353,6 @@ class HotelAgent:
                     self.logger.debug("Got %d real hotels from Amadeus", len(real_hotels_list))
                     
                     # Calculate budget constraints
-                    nights = (request.check_out - request.check_in).days
                     # Frontend sends total accommodation budget as max_price, which IS the per-night budget
                     max_price_per_night = request.max_price if request.max_price else 8000
                     
@@ -94,10 +367,7 @@ class HotelAgent:
                     
                     if hotels:
                         self.logger.debug("Created %d hotels with REAL names + AI pricing", len(hotels))
-                        return HotelSearchResponse(
-                            hotels=hotels,
-                            total_count=len(hotels)
-                        )
+                    return hotels
                 else:
                     self.logger.warning("Amadeus returned empty hotel list for destination: %s", request.destination)
         
@@ -105,15 +375,25 @@ class HotelAgent:
             self.logger.warning("Amadeus service not available, using generated data")
         except Exception as e:
             self.logger.exception("Hotel search error: %s", e)
-
+        return []
+    
+    def _fallback_response(self, request: HotelSearchRequest, nights: int) -> HotelSearchResponse:
         # Fallback to fully generated realistic data
         self.logger.info("Falling back to generated hotels for: %s", request.destination)
         # Frontend sends total accommodation budget as max_price, which IS the per-night budget
         max_price_per_night = request.max_price if request.max_price else 5000
-        nights = (request.check_out - request.check_in).days
         self.logger.debug("Using per-night budget: %s for %d nights", max_price_per_night, nights)
         
-        hotels = self._generate_fallback_hotels(request, max_price_per_night)
+        # Repeat requests (refreshes, re-running the pipeline) get the same list back
+        # instead of a fresh random draw. The key uses the exact cap so no cached
+        # price can exceed it, and the destination and trip type as given since
+        # both are written into the hotel names and descriptions
+        cache_key = (request.destination, max_price_per_night, request.trip_type)
+        hotels = _fallback_cache.get(cache_key)
+        if hotels is None:
+            hotels = self._generate_fallback_hotels(request, max_price_per_night)
+            _fallback_cache.set(cache_key, hotels)
+        hotels = list(hotels)
 
         return HotelSearchResponse(
             hotels=hotels,
@@ -216,13 +496,14 @@ class HotelAgent:
             address = hotel_data.get('address', {})
             city_name = address.get('cityName', request.destination)
             
-            # Create hotel object
-            hotel = Hotel(
+            # Create hotel object; every field is built here with the right type,
+            # so skip validation
+            hotel = Hotel.model_construct(
                 id=f"amadeus_{hotel_data.get('hotel_id', i)}",
                 name=hotel_data['name'],
-                price=round(price, 0),
+                price=float(price),
                 rating=round(rating, 1),
-                image=self._get_hotel_image(i),
+                image=_HOTEL_IMAGES[i % len(_HOTEL_IMAGES)],
                 location=city_name,
                 amenities=amenities[:5],
                 description=f"Located in {city_name}. Real hotel with AI-estimated pricing.",
@@ -241,55 +522,12 @@ class HotelAgent:
         """
         """
         
-        # Step 1: Search for destination
-        search_url = "https://booking-com.p.rapidapi.com/v1/hotels/locations"
-        
+        # Step 1: Resolve the destination (cached per city name)
         clean_destination = request.destination.strip()
-
-        self.logger.debug("Searching for destination: %s", clean_destination)
-        self.logger.debug("RapidAPI key present (masked)")
-
-        search_params = {
-            "name": clean_destination,
-            "locale": "en-gb"
-        }
-        search_headers = {
-            "X-RapidAPI-Key": self.rapidapi_key,
-            "X-RapidAPI-Host": "booking-com.p.rapidapi.com"
-        }
-        try:
-            self.logger.debug("Making API call to: %s", search_url)
-            search_response = requests.get(search_url, headers=search_headers, params=search_params, timeout=10)
-            self.logger.debug("Response status: %s", search_response.status_code)
-            search_response.raise_for_status()
-            locations = search_response.json()
-            self.logger.debug("Found %d locations from rapidapi", len(locations))
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 403:
-                raise Exception(f"❌ API Key Invalid or Subscription Required. Visit: https://rapidapi.com/apidojo/api/booking")
-            elif e.response.status_code == 429:
-                raise Exception(f"⚠️ Rate Limit Exceeded (500 requests/month). Try again later or upgrade plan.")
-            else:
-                raise Exception(f"API Error {e.response.status_code}: {e}")
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 403:
-                raise Exception(f"❌ API Key Invalid or Subscription Required. Visit: https://rapidapi.com/apidojo/api/booking")
-            elif e.response.status_code == 429:
-                raise Exception(f"⚠️ Rate Limit Exceeded (500 requests/month). Try again later or upgrade plan.")
-            else:
-                raise Exception(f"API Error {e.response.status_code}: {e}")
-        
-        if not locations or len(locations) == 0:
-            raise Exception(f"No location found for: {clean_destination}")
-        
-        dest_id = locations[0].get('dest_id')
-        dest_type = locations[0].get('dest_type', 'city')
-        
-        if not dest_id:
-            raise Exception(f"Invalid destination ID for: {clean_destination}")
+        dest_id, dest_type = self._lookup_destination(clean_destination)
         
         # Step 2: Search hotels
-        hotels_url = "https://booking-com.p.rapidapi.com/v1/hotels/search"
+        hotels_url = f"https://{RAPIDAPI_HOST}/v1/hotels/search"
         
         checkin = request.check_in.strftime('%Y-%m-%d')
         checkout = request.check_out.strftime('%Y-%m-%d')
@@ -309,95 +547,158 @@ class HotelAgent:
             "page_number": "0"
         }
         
-        try:
-            hotels_response = requests.get(hotels_url, headers=search_headers, params=hotels_params, timeout=15)
-            hotels_response.raise_for_status()
-            result = hotels_response.json()
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 429:
-                raise Exception(f"⚠️ Rate Limit Exceeded. Monthly quota used. Upgrade or wait for reset.")
-            else:
-                raise Exception(f"Hotels API Error {e.response.status_code}: {e}")
+        # Identical searches within a few minutes (e.g. a page refresh) reuse the result
+        search_key = (dest_id, checkin, checkout, request.adults, request.children)
+        result = _hotel_search_cache.get(search_key)
+        if result is None:
+            hotels_response = self._get_with_retry(hotels_url, hotels_params, timeout=15)
+            result = orjson.loads(hotels_response.content)
+            _hotel_search_cache.set(search_key, result)
+        
+        # Parse hotels in two passes: price every result and drop those over budget,
+        # then build models only for the ones that are kept
+        nights = max((request.check_out - request.check_in).days, 1)
+        budget_cap = request.max_price * 1.5
+        destination = request.destination
+        priced = []
+        for idx, hotel_data in enumerate(result.get('result', [])[:15]):  # Limit to 15 hotels
+            try:
+                gross_price = hotel_data.get('price_breakdown', {}).get('gross_price', 0)
+                price_per_night = float(gross_price) / nights if gross_price else 2000
+            except (AttributeError, TypeError, ValueError) as e:
+                self.logger.debug("Error parsing hotel %d: %s", idx, e)
+                continue
+            
+            # Skip if over budget
+            if price_per_night <= budget_cap:
+                priced.append((idx, hotel_data, price_per_night))
         
-        # Parse hotels
         hotels = []
-        hotel_results = result.get('result', [])
-        
-        for idx, hotel_data in enumerate(hotel_results[:15]):  # Limit to 15 hotels
+        for idx, hotel_data, price_per_night in priced:
             try:
-                # Get price
-                price_breakdown = hotel_data.get('price_breakdown', {})
-                gross_price = price_breakdown.get('gross_price', 0)
-                
-                # Convert to per night price
-                nights = max((request.check_out - request.check_in).days, 1)
-                price_per_night = float(gross_price) / nights if gross_price else 2000
-                
-                # Skip if over budget
-                if price_per_night > request.max_price * 1.5:
-                    continue
-                
-                # Get image
-                main_photo = hotel_data.get('main_photo_url', '') or hotel_data.get('max_photo_url', '')
-                if not main_photo:
-                    main_photo = self._get_hotel_image(idx)
-                
-                # Determine tag
-                tag = "Best Value"
-                if price_per_night > 8000:
-                    tag = "Luxury Pick"
-                elif price_per_night < 1500:
-                    tag = "Budget Friendly"
-                elif hotel_data.get('is_family_friendly'):
-                    tag = "Family Friendly"
-                
-                hotels.append(Hotel(
-                    id=f"real_hotel_{hotel_data.get('hotel_id', idx)}",
-                    name=hotel_data.get('hotel_name', f"Hotel {idx+1}"),
-                    price=round(price_per_night, 0),
-                    rating=float(hotel_data.get('review_score', 4.0)),
-                    image=main_photo,
-                    location=hotel_data.get('address', '') or hotel_data.get('city', request.destination),
-                    amenities=self._parse_facilities(hotel_data.get('hotel_facilities', '')),
-                    description=hotel_data.get('hotel_name_trans', hotel_data.get('hotel_name', '')),
-                    tag=tag
-                ))
+                hotels.append(Hotel(**self._real_hotel_fields(idx, hotel_data, price_per_night, destination)))
             except Exception as e:
                 self.logger.debug("Error parsing hotel %d: %s", idx, e)
-                continue
         
         return hotels
     
+    def _real_hotel_fields(self, idx: int, hotel_data: Dict, price_per_night: float, destination: str) -> Dict:
+        """
+        Map one RapidAPI search result to Hotel fields, reading each key once
+        """
+        name = hotel_data.get('hotel_name') or f"Hotel {idx+1}"
+        
+        # Determine tag
+        if price_per_night > 8000:
+            tag = "Luxury Pick"
+        elif price_per_night < 1500:
+            tag = "Budget Friendly"
+        elif hotel_data.get('is_family_friendly'):
+            tag = "Family Friendly"
+        else:
+            tag = "Best Value"
+        
+        return {
+            "id": f"real_hotel_{hotel_data.get('hotel_id', idx)}",
+            "name": name,
+            "price": round(price_per_night, 0),
+            "rating": float(hotel_data.get('review_score') or 4.0),
+            "image": hotel_data.get('main_photo_url') or hotel_data.get('max_photo_url') or _HOTEL_IMAGES[idx % len(_HOTEL_IMAGES)],
+            "location": hotel_data.get('address') or hotel_data.get('city') or destination,
+            "amenities": self._parse_facilities(hotel_data.get('hotel_facilities', '')),
+            "description": hotel_data.get('hotel_name_trans') or name,
+            "tag": tag
+        }
+    
+    def _lookup_destination(self, clean_destination: str) -> Tuple[str, str]:
+        """
+        Resolve a destination name to RapidAPI's (dest_id, dest_type)
+        
+        City names map to the same ids for a long time, so lookups are cached
+        and repeat destinations skip the locations call entirely.
+        """
+        cache_key = clean_destination.lower()
+        cached = _location_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        search_url = f"https://{RAPIDAPI_HOST}/v1/hotels/locations"
+        
+        self.logger.debug("Searching for destination: %s", clean_destination)
+
+        search_params = {
+            "name": clean_destination,
+            "locale": "en-gb"
+        }
+        self.logger.debug("Making API call to: %s", search_url)
+        search_response = self._get_with_retry(search_url, search_params, timeout=10)
+        self.logger.debug("Response status: %s", search_response.status_code)
+        locations = orjson.loads(search_response.content)
+        self.logger.debug("Found %d locations from rapidapi", len(locations))
+        
+        if not locations or len(locations) == 0:
+            raise Exception(f"No location found for: {clean_destination}")
+        
+        dest_id = locations[0].get('dest_id')
+        dest_type = locations[0].get('dest_type', 'city')
+        
+        if not dest_id:
+            raise Exception(f"Invalid destination ID for: {clean_destination}")
+        
+        _location_cache.set(cache_key, (dest_id, dest_type))
+        return dest_id, dest_type
+    
+    def _get_with_retry(self, url: str, params: Dict, timeout: float, max_retries: int = MAX_RETRIES) -> requests.Response:
+        """
+        GET from RapidAPI, backing off on rate limits and server errors
+        
+        Waits with exponential backoff plus jitter, or longer if the server
+        sends Retry-After, never more than MAX_BACKOFF_SECONDS. Raises
+        HotelAPIError once retries are exhausted, the status is not retryable,
+        Retry-After asks for a longer wait, or a second 429 in a row starts
+        the cooldown.
+        """
+        if time.monotonic() < self._cooldown_until:
+            raise HotelAPIError(429, "⚠️ RapidAPI rate limited recently; skipping until the cooldown ends")
+        
+        for attempt in range(max_retries + 1):
+            response = self.session.get(url, params=params, timeout=timeout)
+            status = response.status_code
+            if status < 400:
+                self._consecutive_429s = 0
+                return response
+            
+            error = HotelAPIError(status, _ERROR_MESSAGES.get(status) or f"API Error {status}: {url}", response)
+            if status == 429:
+                self._consecutive_429s += 1
+                if self._consecutive_429s >= 2:
+                    self._cooldown_until = time.monotonic() + RATE_LIMIT_COOLDOWN_SECONDS
+                    raise error
+            if not error.retryable or attempt == max_retries:
+                raise error
+            
+            delay = 2 ** attempt * 0.5 + random.uniform(0, 0.5)
+            retry_after = retry_after_seconds(error)
+            if retry_after is not None:
+                if retry_after > MAX_BACKOFF_SECONDS:
+                    # Too long to hold a worker thread; let the caller fall back
+                    raise error
+                delay = max(delay, retry_after)
+            delay = min(delay, MAX_BACKOFF_SECONDS)
+            self.logger.warning("RapidAPI returned %d; retrying in %.1fs (attempt %d/%d)", status, delay, attempt + 1, max_retries)
+            time.sleep(delay)
+    
     def _parse_facilities(self, facilities_string: str) -> List[str]:
         """Parse facilities from API response"""
         if not facilities_string:
-            return ["WiFi", "Air Conditioning", "Room Service"]
-        
-        # Common facility mappings
-        facility_map = {
-            "wifi": "Free WiFi",
-            "pool": "Swimming Pool",
-            "gym": "Fitness Center",
-            "spa": "Spa",
-            "restaurant": "Restaurant",
-            "bar": "Bar",
-            "parking": "Free Parking",
-            "breakfast": "Breakfast Included",
-            "ac": "Air Conditioning",
-            "room service": "Room Service"
-        }
+            return list(_DEFAULT_FACILITIES)
         
-        facilities = []
-        facilities_lower = facilities_string.lower()
-        for key, value in facility_map.items():
-            if key in facilities_lower and len(facilities) < 5:
-                facilities.append(value)
+        # One scan finds every key present; output keeps the mapping's order
+        found = set(_FACILITY_RE.findall(facilities_string.lower()))
+        facilities = [value for key, value in _FACILITY_KEYS if key in found][:5]
         
         # Add defaults if empty
-        if not facilities:
-            facilities = ["WiFi", "Air Conditioning", "Room Service"]
-        
-        return facilities[:5]
+        return facilities or list(_DEFAULT_FACILITIES)
     
     def _generate_hotels(self, request: HotelSearchRequest) -> List[Hotel]:
         """
@@ -406,23 +707,13 @@ class HotelAgent:
         days = (request.check_out - request.check_in).days
         max_price_per_night = request.max_price / days if days > 0 else request.max_price
         
-        prompt = f"""Generate 15 real hotels in {request.destination}, India as JSON array.
-
+        # Static instructions first and the per-request values last, so requests
+        # share the longest possible prompt prefix
+        prompt = _HOTEL_PROMPT + f"""
+Destination: {request.destination}, India
 Budget: {int(max_price_per_night)} INR/night max
-Type: {request.trip_type}
-
-Use REAL Indian hotel chains: Taj, Oberoi, ITC, Leela, Marriott, Hyatt, Radisson, Novotel, Lemon Tree, Ginger, Treebo, FabHotel, OYO
-
-Format (return ONLY JSON array, no markdown):
-[{{"name":"Taj Palace Delhi","price":2500,"rating":4.2,"location":"Connaught Place","amenities":["WiFi","Pool","Gym"],"description":"Luxury hotel in city center","tag":"Luxury Pick"}}]
-
-Rules:
-- Use real hotel chain names + city
-- price: number 800-{int(max_price_per_night*1.2)}
-- rating: 3.5-4.8
-- tag: "Luxury Pick","Budget Friendly","Family Friendly","Best Value"
-- description: max 80 chars
-- 15 hotels only"""
+Price ceiling: {int(max_price_per_night*1.2)}
+Type: {request.trip_type}"""
         
         try:
             response = self.model.generate_content(
@@ -434,12 +725,8 @@ Rules:
                 self.logger.debug("No valid response from AI, using fallback")
                 return self._generate_fallback_hotels(request, max_price_per_night)[:15]
             
-            content = response.text.strip()
-            
-            # Clean markdown
-            content = content.replace("```json", "").replace("```", "").strip()
-            
-            hotels_data = json.loads(content)
+            # The model is set to answer in JSON, so there is no markdown to strip
+            hotels_data = orjson.loads(response.text)
             
             # Convert to Hotel objects
             hotels = []
@@ -454,7 +741,7 @@ Rules:
                         name=hotel_data.get("name", f"Hotel {idx+1}"),
                         price=price,
                         rating=float(hotel_data.get("rating", 4.0)),
-                        image=self._get_hotel_image(idx),
+                        image=_HOTEL_IMAGES[idx % len(_HOTEL_IMAGES)],
                         location=hotel_data.get("location", "City Center"),
                         amenities=hotel_data.get("amenities", ["WiFi", "Parking", "Breakfast"]),
                         description=hotel_data.get("description", "Comfortable accommodation"),
@@ -482,132 +769,24 @@ Rules:
         """
         hotels = []
         
-        # Real Indian hotel chains and properties with more realistic price ranges
-        hotel_chains = {
-            "luxury": [
-                {"name": "Taj Palace", "base_price": 9500, "variance": 0.25, "rating": 4.7},
-                {"name": "The Oberoi", "base_price": 13500, "variance": 0.20, "rating": 4.8},
-                {"name": "ITC Grand", "base_price": 10200, "variance": 0.22, "rating": 4.6},
-                {"name": "Leela Palace", "base_price": 12800, "variance": 0.18, "rating": 4.8},
-                {"name": "JW Marriott", "base_price": 8200, "variance": 0.28, "rating": 4.6},
-                {"name": "The Ritz-Carlton", "base_price": 15000, "variance": 0.20, "rating": 4.9},
-            ],
-            "premium": [
-                {"name": "Hyatt Regency", "base_price": 6200, "variance": 0.30, "rating": 4.5},
-                {"name": "Radisson Blu", "base_price": 5100, "variance": 0.35, "rating": 4.4},
-                {"name": "Novotel", "base_price": 4600, "variance": 0.32, "rating": 4.3},
-                {"name": "Holiday Inn", "base_price": 3900, "variance": 0.38, "rating": 4.2},
-                {"name": "Crowne Plaza", "base_price": 5700, "variance": 0.28, "rating": 4.4},
-                {"name": "Courtyard by Marriott", "base_price": 4800, "variance": 0.33, "rating": 4.3},
-            ],
-            "midrange": [
-                {"name": "Lemon Tree Hotel", "base_price": 2800, "variance": 0.40, "rating": 4.0},
-                {"name": "Ginger Hotel", "base_price": 2200, "variance": 0.45, "rating": 3.9},
-                {"name": "Treebo Hotels", "base_price": 1950, "variance": 0.48, "rating": 3.8},
-                {"name": "FabHotel", "base_price": 1650, "variance": 0.50, "rating": 3.7},
-                {"name": "Bloom Hotel", "base_price": 2450, "variance": 0.42, "rating": 4.0},
-                {"name": "Keys Hotels", "base_price": 3100, "variance": 0.38, "rating": 4.1},
-            ],
-            "budget": [
-                {"name": "OYO Flagship", "base_price": 1350, "variance": 0.55, "rating": 3.5},
-                {"name": "Collection O", "base_price": 1150, "variance": 0.60, "rating": 3.6},
-                {"name": "Zostel", "base_price": 850, "variance": 0.35, "rating": 4.2},
-                {"name": "GoStays", "base_price": 980, "variance": 0.58, "rating": 3.4},
-                {"name": "Spot ON", "base_price": 1220, "variance": 0.52, "rating": 3.5},
-                {"name": "Capital O", "base_price": 1450, "variance": 0.48, "rating": 3.7},
-            ]
-        }
-        
-        locations = {
-            "goa": ["Calangute", "Baga Beach", "Anjuna", "Candolim", "Panjim"],
-            "mumbai": ["Colaba", "Bandra", "Andheri", "Powai", "Lower Parel"],
-            "delhi": ["Connaught Place", "Aerocity", "Karol Bagh", "Paharganj", "Dwarka"],
-            "bangalore": ["MG Road", "Whitefield", "Indiranagar", "Koramangala", "Electronic City"],
-            "bengaluru": ["MG Road", "Whitefield", "Indiranagar", "Koramangala", "Electronic City"],
-            "chennai": ["T Nagar", "Anna Salai", "Egmore", "Mylapore", "OMR"],
-            "jaipur": ["City Palace Area", "MI Road", "Bani Park", "Malviya Nagar", "Vaishali Nagar"],
-            "vellore": ["Katpadi", "Fort Area", "Gandhi Nagar", "CMC Campus", "Sathuvachari"],
-            "puducherry": ["White Town", "Beach Road", "Auroville", "French Quarter", "Promenade"],
-            "pondicherry": ["White Town", "Beach Road", "Auroville", "French Quarter", "Promenade"],
-            "default": ["City Center", "Downtown", "Near Station", "Airport Road", "Main Street"]
-        }
-        
         # Get locations for destination
         dest_key = request.destination.lower()
-        dest_locations = locations.get(dest_key, locations["default"])
-        
-        # Determine hotel categories based on budget with better distribution
-        all_hotels = []
-        if max_price > 8000:
-            # High budget - mix of luxury and premium
-            all_hotels.extend(hotel_chains["luxury"] * 2)
-            all_hotels.extend(hotel_chains["premium"] * 2)
-            all_hotels.extend(hotel_chains["midrange"])
-        elif max_price > 4000:
-            # Medium-high budget - premium and midrange
-            all_hotels.extend(hotel_chains["premium"] * 3)
-            all_hotels.extend(hotel_chains["midrange"] * 2)
-            all_hotels.extend(hotel_chains["budget"])
-        elif max_price > 2000:
-            # Medium budget - midrange focused
-            all_hotels.extend(hotel_chains["midrange"] * 3)
-            all_hotels.extend(hotel_chains["premium"])
-            all_hotels.extend(hotel_chains["budget"] * 2)
-        else:
-            # Low budget - budget and economy midrange
-            all_hotels.extend(hotel_chains["budget"] * 3)
-            all_hotels.extend(hotel_chains["midrange"] * 2)
-        
-        # Shuffle for variety
-        random.shuffle(all_hotels)
-        
-        amenities_pool = [
-            ["Free WiFi", "Swimming Pool", "Gym", "Restaurant", "Room Service"],
-            ["Free WiFi", "Parking", "Restaurant", "24/7 Front Desk"],
-            ["Free WiFi", "Complimentary Breakfast", "AC Rooms", "TV"],
-            ["WiFi", "Hot Water", "Clean Rooms", "Laundry Service"],
-            ["Free WiFi", "Bar", "Spa", "Conference Room", "Airport Shuttle"],
-            ["WiFi", "Rooftop Restaurant", "Gym", "Pool", "Concierge"],
-        ]
-        
-        tags_mapping = {
-            "luxury": "Luxury Pick",
-            "premium": "Best Value",
-            "midrange": "Family Friendly",
-            "budget": "Budget Friendly"
-        }
-        
-        # Destination price multipliers (some cities are more expensive)
-        destination_multipliers = {
-            "mumbai": 1.3,
-            "delhi": 1.2,
-            "bangalore": 1.25,
-            "bengaluru": 1.25,
-            "goa": 1.4,
-            "jaipur": 0.9,
-            "chennai": 1.1,
-            "puducherry": 0.95,
-            "pondicherry": 0.95,
-            "vellore": 0.75,
-            "default": 1.0
-        }
+        dest_locations = _LOCATIONS.get(dest_key, _LOCATIONS["default"])
         
-        dest_multiplier = destination_multipliers.get(dest_key, destination_multipliers["default"])
+        # Determine hotel categories based on budget with better distribution, then
+        # draw a shuffled selection straight from the weighted chains
+        population, counts = next(
+            (chains, weights) for threshold, chains, weights in _CHAIN_MIX_BY_BUDGET
+            if max_price > threshold
+        )
         
-        # Trip type multipliers
-        trip_multipliers = {
-            "luxurious": 1.35,
-            "adventure": 1.0,
-            "budget": 0.75,
-            "family": 1.15,
-            "romantic": 1.25,
-            "business": 1.2
-        }
+        # Generate 10 hotels spanning the FULL price range from budget to max_price
+        hotels_to_generate = min(10, sum(counts))
+        all_hotels = random.sample(population, k=hotels_to_generate, counts=counts)
         
-        trip_multiplier = trip_multipliers.get(request.trip_type.lower(), 1.0)
+        dest_multiplier = _DESTINATION_MULTIPLIERS.get(dest_key, _DESTINATION_MULTIPLIERS["default"])
         
-        # Generate 10 hotels spanning the FULL price range from budget to max_price
-        hotels_to_generate = min(10, len(all_hotels))
+        trip_multiplier = _TRIP_MULTIPLIERS.get(request.trip_type.lower(), 1.0)
         
         # Calculate price distribution - from 25% to 100% of max budget
         min_price = max_price * 0.25
@@ -658,16 +837,17 @@ Rules:
                 category = "budget"
                 rating = random.uniform(3.4, 3.9)
             
-            hotels.append(Hotel(
+            # Generated from our own tables with the right types, so skip validation
+            hotels.append(Hotel.model_construct(
                 id=f"hotel_{i+1}",
                 name=f"{hotel_data['name']} {request.destination}",
-                price=round(price, 0),
+                price=float(price),
                 rating=round(rating, 1),
-                image=self._get_hotel_image(i),
+                image=_HOTEL_IMAGES[i % len(_HOTEL_IMAGES)],
                 location=random.choice(dest_locations),
-                amenities=random.choice(amenities_pool),
+                amenities=list(random.choice(_AMENITIES_POOL)),
                 description=f"Well-appointed {category} hotel in {request.destination}, perfect for {request.trip_type} travelers.",
-                tag=tags_mapping[category]
+                tag=_TAGS_MAPPING[category]
             ))
         
         # Sort by price to show budget options first
@@ -676,31 +856,16 @@ Rules:
         self.logger.debug("Generated %d hotels with prices", len(hotels))
         
         return hotels
-    
-    def _get_hotel_image(self, index: int) -> str:
-        """
-        Get hotel image URL - using stable image CDN with actual hotel photos
-        """
-        # Using picsum.photos as reliable fallback + verified hotel images
-        hotel_images = [
-            "https://images.unsplash.com/photo-1566073771259-6a8506099945?w=800",  # Luxury hotel
-            "https://images.unsplash.com/photo-1542314831-068cd1dbfeeb?w=800",  # Hotel room
-            "https://images.unsplash.com/photo-1445019980597-93fa8acb246c?w=800",  # Modern hotel
-            "https://images.unsplash.com/photo-1551882547-ff40c63fe5fa?w=800",  # Resort pool
-            "https://images.unsplash.com/photo-1582719508461-905c673771fd?w=800",  # Hotel exterior
-            "https://images.unsplash.com/photo-1571896349842-33c89424de2d?w=800",  # Hotel lobby
-            "https://images.unsplash.com/photo-1564501049412-61c2a3083791?w=800",  # Beach resort
-            "https://images.unsplash.com/photo-1520250497591-112f2f40a3f4?w=800",  # Hotel interior
-            "https://images.unsplash.com/photo-1584132967334-10e028bd69f7?w=800",  # Boutique hotel
-            "https://images.unsplash.com/photo-1512918728675-ed5a9ecdebfd?w=800",  # Bedroom
-            "https://images.unsplash.com/photo-1611892440504-42a792e24d32?w=800",  # Modern room
-            "https://images.unsplash.com/photo-1631049307264-da0ec9d70304?w=800",  # Hotel view
-            "https://images.unsplash.com/photo-1618773928121-c32242e63f39?w=800",  # Luxury suite
-            "https://images.unsplash.com/photo-1590490360182-c33d57733427?w=800",  # Resort
-            "https://images.unsplash.com/photo-1455587734955-081b22074882?w=800",  # Hotel building
-        ]
-        return hotel_images[index % len(hotel_images)]
-
-
-# Initialize agent instance
-hotel_agent = HotelAgent()
+
+
+@functools.cache
+def get_hotel_agent() -> HotelAgent:
+    """Shared agent instance, created on first use rather than at import"""
+    return HotelAgent()
+
+
+def __getattr__(name: str):
+    # `hotel_agent` is built on first access so importing the module stays cheap
+    if name == "hotel_agent":
+        return get_hotel_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -137,13 +137,13 @@ class TransportAgent:
                         for flight in real_flights:
                             try:
                                 # Skip if any required field is missing
-                                if not flight.get('duration') or flight['duration'] == 'N/A':
+                                if not flight.duration or flight.duration == 'N/A':
                                     continue
-                                if not flight.get('departure_time') or flight['departure_time'] == 'N/A':
+                                if not flight.departure_time or flight.departure_time == 'N/A':
                                     continue
                                     
                                 # Parse duration (format: PT2H30M -> 2h 30m)
-                                duration_str = flight['duration']
+                                duration_str = flight.duration
                                 duration = duration_str.replace('PT', '').replace('H', 'h ').replace('M', 'm').strip()
                                 if not duration:
                                     duration = "2h 30m"  # Default
@@ -151,28 +151,28 @@ class TransportAgent:
                                 durations.append(duration)
                                 
                                 # Get airline code and convert to full name
-                                airline_code = flight.get('airline', 'XX')
+                                airline_code = flight.airline
                                 airline_name = self.AIRLINE_NAMES.get(airline_code, airline_code)
-                                flight_number = flight.get('flight_number', 'N/A')
+                                flight_number = flight.flight_number
                                 
                                 # Parse departure time for display
                                 try:
-                                    departure_time = datetime.fromisoformat(flight['departure_time'].replace('Z', '+00:00'))
+                                    departure_time = datetime.fromisoformat(flight.departure_time.replace('Z', '+00:00'))
                                     time_str = departure_time.strftime("%I:%M %p")
                                 except:
                                     time_str = "Various times"
                                 
                                 # Parse arrival time if available
                                 arrival_str = ""
-                                if flight.get('arrival_time') and flight['arrival_time'] != 'N/A':
+                                if flight.arrival_time and flight.arrival_time != 'N/A':
                                     try:
-                                        arrival_time = datetime.fromisoformat(flight['arrival_time'].replace('Z', '+00:00'))
+                                        arrival_time = datetime.fromisoformat(flight.arrival_time.replace('Z', '+00:00'))
                                         arrival_str = f" - {arrival_time.strftime('%I:%M %p')}"
                                     except:
                                         pass
                                 
                                 # Get cabin class
-                                cabin_class = flight.get('cabin_class', 'ECONOMY')
+                                cabin_class = flight.cabin_class
                                 if isinstance(cabin_class, str):
                                     cabin_class = cabin_class.title()
                                 
@@ -183,7 +183,7 @@ class TransportAgent:
                                 options.append(TransportOption(
                                     carrier=carrier_display,
                                     time=time_display,
-                                    price=round(flight['price'], 2),
+                                    price=round(flight.price, 2),
                                     duration=duration,
                                     class_type=cabin_class
                                 ))
@@ -13,6 +13,18 @@ class Settings(BaseSettings):
     mongodb_uri: str = "mongodb://localhost:27017"
     mongodb_db: str = "travel_agent"
     
+    # Gemini client-side rate limits (~80% of the free-tier quota)
+    gemini_rpm: int = 4
+    gemini_tpm: int = 800_000
+    gemini_rpd: int = 400
+    gemini_max_concurrency: int = 4
+    
+    # Seconds to wait for Amadeus hotel names before serving generated hotels
+    amadeus_hotel_timeout: float = 8.0
+    
+    # Persistent LLM response cache (SQLite file); empty to disable
+    llm_cache_path: Optional[str] = "llm_cache.sqlite3"
+    
     # Server settings
     host: str = "0.0.0.0"
     port: int = 8000
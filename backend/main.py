@@ -1,13 +1,17 @@
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
 from typing import Dict, Any, Optional
 import uvicorn
 from bson import ObjectId
 from datetime import datetime
 
 from config import settings
+import asyncio
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from models.schemas import (
     TripRequest, BudgetResponse,
     HotelSearchRequest, HotelSearchResponse,
@@ -15,34 +19,39 @@ from models.schemas import (
     ItineraryRequest, ItineraryResponse,
     SaveTripRequest, UpdateTripRequest, SavedTrip, TripListResponse
 )
-from agents.budget_agent import budget_agent
 from agents.budget_agent_v2 import enhanced_budget_agent
 from agents.coordinator import agent_coordinator
-from agents.hotel_agent import hotel_agent
-from agents.transport_agent import transport_agent
-from agents.activities_agent import activities_agent
 from db import connect_to_mongo, close_mongo_connection, get_trips_collection
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Travel Agent AI API",
     description="AI-powered travel planning with multi-agent system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Module logger
 logger = logging.getLogger(__name__)
 
+# Agents log through a queue; a listener thread does the actual stream writes
+# so handler I/O never blocks a request
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, logging.StreamHandler(), respect_handler_level=True)
+logging.basicConfig(handlers=[QueueHandler(_log_queue)])
+
 # Startup and shutdown events
 @app.on_event("startup")
 async def startup_db_client():
     """Connect to MongoDB on startup"""
+    _log_listener.start()
     await connect_to_mongo()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close MongoDB connection on shutdown"""
     await close_mongo_connection()
+    _log_listener.stop()
 
 # Configure CORS
 app.add_middleware(
@@ -53,6 +62,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Hotel, transport and itinerary payloads are usually several KB of JSON
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
 
 @app.get("/")
 async def root():
@@ -100,12 +112,14 @@ async def search_hotels(request: HotelSearchRequest):
     Uses Pipeline to respect budget constraints
     """
     try:
-        result = agent_coordinator.search_hotels(request)
+        # The Amadeus lookup runs off the event loop, so a client's hotel and
+        # transport searches proceed in parallel
+        result = await agent_coordinator.search_hotels_async(request)
         return result
     except Exception as e:
         logger.exception("Hotel search error: %s", str(e))
         # Fallback to regular search if pipeline not initialized
-        result = hotel_agent.search_hotels(request)
+        result = await agent_coordinator.hotel_agent.search_hotels_async(request)
         return result
 
 
@@ -116,12 +130,12 @@ async def search_transport(request: TransportSearchRequest):
     Uses Pipeline to respect budget constraints
     """
     try:
-        result = agent_coordinator.search_transport(request)
+        result = await asyncio.to_thread(agent_coordinator.search_transport, request)
         return result
     except Exception as e:
         logger.exception("Transport search error: %s", str(e))
         # Fallback to regular search if pipeline not initialized
-        result = transport_agent.search_transport(request)
+        result = await asyncio.to_thread(agent_coordinator.transport_agent.search_transport, request)
         return result
 
 
@@ -132,13 +146,31 @@ async def generate_itinerary(request: ItineraryRequest):
     Uses Pipeline to respect budget constraints
     """
     try:
-        result = agent_coordinator.generate_itinerary(request)
-        return result
+        _, payload = await agent_coordinator.generate_itinerary_json(request)
     except Exception as e:
         logger.exception("Itinerary generation error: %s", str(e))
         # Fallback to regular generation if pipeline not initialized
-        result = activities_agent.generate_itinerary(request)
-        return result
+        _, payload = await agent_coordinator.activities_agent.generate_itinerary_json(request)
+    
+    # Already-encoded body, so FastAPI doesn't serialize the model again
+    return Response(content=payload, media_type="application/json")
+
+
+@app.post("/api/itinerary/stream")
+async def stream_itinerary(request: ItineraryRequest):
+    """
+    Stream the itinerary as newline-delimited JSON, one day per line
+    """
+    async def day_lines():
+        async for day_plan in agent_coordinator.stream_itinerary(request):
+            yield day_plan.model_dump_json() + "\n"
+    
+    # GZip would hold days back in its compression buffer, so opt this response out
+    return StreamingResponse(
+        day_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Encoding": "identity"}
+    )
 
 
 @app.post("/api/trip/complete")
@@ -196,7 +228,7 @@ async def save_trip(trip_request: SaveTripRequest):
         # Prepare trip document
         trip_doc = {
             "user_id": trip_request.user_id,
-            "trip": trip_request.trip.model_dump(),
+            "trip": trip_request.trip.model_dump(mode="json"),
             "budget": trip_request.budget.model_dump(),
             "hotel": trip_request.hotel.model_dump() if trip_request.hotel else None,
             "transport": trip_request.transport.model_dump() if trip_request.transport else None,
@@ -313,7 +345,7 @@ async def update_trip(trip_id: str, update_request: UpdateTripRequest):
         update_doc = {}
         
         if update_request.trip is not None:
-            update_doc["trip"] = update_request.trip.model_dump()
+            update_doc["trip"] = update_request.trip.model_dump(mode="json")
         
         if update_request.budget is not None:
             update_doc["budget"] = update_request.budget.model_dump()
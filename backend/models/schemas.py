@@ -1,18 +1,25 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Union
 from datetime import date, datetime
+import sys
 
 
 class TripRequest(BaseModel):
     trip_type: str = Field(..., description="Type of trip: luxurious, adventurous, family, budget, cultural")
     origin: str = Field(..., description="Origin city - where user is traveling from")
     destination: str = Field(..., description="Destination city or location")
-    start_date: Union[date, str] = Field(..., description="Trip start date")
-    end_date: Union[date, str] = Field(..., description="Trip end date")
+    start_date: date = Field(..., description="Trip start date")
+    end_date: date = Field(..., description="Trip end date")
     budget: float = Field(..., gt=0, description="Total budget in INR")
     adults: int = Field(default=2, ge=1, description="Number of adults")
     children: int = Field(default=0, ge=0, description="Number of children")
 
+    @field_validator("trip_type")
+    @classmethod
+    def normalize_trip_type(cls, value: str) -> str:
+        # Lowercased once here so the agents can use it as a lookup key directly
+        return sys.intern(value.lower())
+
 
 class BudgetBreakdown(BaseModel):
     name: str
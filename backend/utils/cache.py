@@ -0,0 +1,125 @@
+"""
+In-process caching helpers shared by the agents
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+# Module logger
+logger = logging.getLogger(__name__)
+
+
+def prompt_cache_key(model_name: str, prompt: str) -> str:
+    """
+    Build a stable cache key for an LLM prompt
+
+    Whitespace and case are normalized so trivially different prompts
+    share the same entry.
+    """
+    normalized = " ".join(prompt.split()).lower()
+    return hashlib.sha256(f"{model_name}:{normalized}".encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a time-to-live
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 24 * 60 * 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    Persistent bytes cache in a local SQLite file
+
+    Meant as a second level behind a TTLCache so cached LLM output survives
+    restarts. WAL mode lets readers proceed while another worker writes.
+    Expired rows are purged on each write. Database errors are logged and
+    treated as misses.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 60 * 60):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the stored bytes, or None if missing or expired"""
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache read failed: %s", e)
+            return None
+
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        try:
+            conn = self._connection()
+            with conn:
+                # Reads only skip expired rows, so drop them here or the file never shrinks
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at)
+                )
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache write failed: %s", e)
@@ -0,0 +1,96 @@
+"""
+Helpers for consuming JSON that arrives from an LLM in pieces
+"""
+from typing import List, Optional
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class JSONArrayItemSplitter:
+    """
+    Incrementally split a streamed JSON array into its top-level objects
+
+    Feed text as it arrives; each call returns the raw JSON of every object
+    completed so far. Anything before the opening bracket (e.g. a markdown
+    fence) is skipped.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._current: List[str] = []
+
+    def feed(self, text: str) -> List[str]:
+        items = []
+        for ch in text:
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                continue
+
+            if self._depth:
+                self._current.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._current = ["{"]
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    items.append("".join(self._current))
+                    self._current = []
+        return items
+
+
+def close_truncated_json(text: str) -> Optional[str]:
+    """
+    Best-effort repair of JSON that was cut off mid-stream (e.g. MAX_TOKENS)
+
+    A single linear pass tracks open containers and string state and
+    remembers where the last container closed. The text is cut there and
+    the containers still open at that point are closed, so a half-written
+    trailing value is dropped and everything complete is kept. Returns None
+    if no container was ever completed.
+    """
+    stack: List[str] = []
+    in_string = False
+    escape = False
+    cut = None
+    cut_stack: tuple = ()
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            if not stack:
+                break
+            stack.pop()
+            cut = i + 1
+            cut_stack = tuple(stack)
+            if not stack:
+                break
+
+    if cut is None:
+        return None
+    return text[:cut] + "".join(_CLOSERS[opener] for opener in reversed(cut_stack))
@@ -0,0 +1,107 @@
+"""
+Client-side rate limiting for outbound LLM calls
+"""
+import asyncio
+import time
+from typing import Optional
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class RateLimitExceeded(Exception):
+    """Raised when the daily request allowance has been used up"""
+
+
+class TokenBucket:
+    """
+    Async limiter for requests per minute, tokens per minute and requests per day
+
+    Callers wait in-process for per-minute capacity instead of sending a
+    request that would only come back as a 429. The daily allowance is not
+    waited on: once it is spent, acquire() raises RateLimitExceeded so the
+    caller can fall back straight away.
+    """
+
+    def __init__(self, rpm: int, tpm: int, rpd: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rpd = rpd
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._day_started = self._updated
+        self._day_count = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _wait_time(self, tokens: int) -> float:
+        """Seconds until both minute buckets can cover one request of this size"""
+        return max(
+            (1 - self._requests) * 60 / self.rpm,
+            (tokens - self._tokens) * 60 / self.tpm,
+            0.0
+        )
+
+    def _check_day(self, now: float) -> None:
+        if now - self._day_started >= DAY_SECONDS:
+            self._day_started = now
+            self._day_count = 0
+        if self._day_count >= self.rpd:
+            raise RateLimitExceeded(f"Daily limit of {self.rpd} requests reached")
+
+    def _take(self, tokens: int) -> None:
+        self._requests -= 1
+        self._tokens -= tokens
+        self._day_count += 1
+
+    def has_token_budget(self, tokens: int = 0) -> bool:
+        """
+        Whether the minute token budget can cover a request of this size now
+
+        Requests per minute are not checked: a caller that only has to wait
+        for a request slot should acquire() it. Raises RateLimitExceeded once
+        the daily allowance is spent.
+        """
+        now = time.monotonic()
+        self._check_day(now)
+        self._refill(now)
+        return min(tokens, self.tpm) <= self._tokens
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until a request estimated at `tokens` tokens may be sent"""
+        tokens = min(tokens, self.tpm)
+        # Waiters queue on the lock, so capacity is handed out in arrival order
+        async with self._lock:
+            now = time.monotonic()
+            self._check_day(now)
+
+            self._refill(now)
+            wait = self._wait_time(tokens)
+            while wait > 0:
+                await asyncio.sleep(wait)
+                self._refill(time.monotonic())
+                wait = self._wait_time(tokens)
+
+            self._take(tokens)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt size for budgeting; ~4 characters per token"""
+    return len(text) // 4
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Retry-After from an HTTP error's response headers, if the server sent one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None